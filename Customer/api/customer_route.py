@@ -5,10 +5,15 @@ from fastapi import (
     HTTPException, 
     status,
     BackgroundTasks,
-    Depends
+    Depends,
+    Header
 )
-from typing import List, Optional, Dict
+from typing import Awaitable, Callable, List, Optional, Dict
 from dependency_injector.wiring import inject, Provide
+import asyncio
+import hashlib
+import json
+import time
 import uuid
 import logging
 from loguru import logger
@@ -16,23 +21,268 @@ from datetime import datetime
 
 from Library.utils import (
     MultiDocumentProcessor, 
-    encode_image_to_base64,
+    encode_image_to_base64_async,
     DocumentExtractionResult
 )
+from Library.image_processing import PreprocessedImage, preprocess_document_image_async
+from Library.ingestion import IngestedFile, UploadRejectedError, detect_image_type, ingest_upload
+from Library.extraction_profiles import get_extraction_profile
+from Library.metrics import metrics
 from bootstrap.container import Container
 from Customer.services.customer_service import CustomerService
 from Customer.services.verification_service import VerificationService
-from Customer.dto.requests.customer_request import CustomerCreateRequest, CustomerUpdateRequest
+from Customer.dto.requests.customer_request import (
+    CustomerCreateRequest,
+    CustomerUpdateRequest,
+    S3DocumentExtractionRequest,
+    S3FaceVerificationRequest
+)
 from Customer.dto.response.customer_response import CustomerResponse
 from Customer.services.face_verification_service import FaceVerificationService
+from Customer.services.ocr_job_service import OCRJob, OCRJobService, QueueFullError
+from Customer.services.session_store import SessionStore
+from Customer.services.idempotency_store import (
+    IdempotencyConflictError,
+    IdempotencyInProgressError,
+    IdempotencyStore
+)
+from Library.resilience import ServiceUnavailableError
 
 router = APIRouter(
     prefix="/customer",
     tags=["Customer Management"]
 )
 
-# Store registration sessions in memory (in production, use Redis/DB)
-registration_sessions = {}
+def _validate_document_upload(documents: List[UploadFile], extraction_profile: Optional[str]) -> None:
+    """Reject uploads the extraction pipeline cannot handle"""
+    # Validate file inputs
+    if len(documents) > 2:
+        logger.error("Maximum 2 documents allowed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Maximum 2 documents allowed"
+        )
+    
+    try:
+        get_extraction_profile(extraction_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Validate file types
+    allowed_types = {'image/jpeg', 'image/png', 'image/gif'}
+    for file in documents:
+        if file.content_type not in allowed_types:
+            logger.error(f"Unsupported file type: {file.content_type}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported file type: {file.content_type}"
+            )
+
+def _upload_rejected(e: UploadRejectedError) -> HTTPException:
+    logger.error(f"Rejected upload: {str(e)}")
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE if e.too_large else status.HTTP_400_BAD_REQUEST,
+        detail=str(e)
+    )
+
+def _document_keys(count: int) -> Dict:
+    """S3 keys and document types for 1-2 documents (ID card first, then birth certificate)"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    keys = [f"documents/id_card_{uuid.uuid4()}_{timestamp}.jpg"]
+    doc_types = ["ID Card"]
+    if count > 1:
+        keys.append(f"documents/birth_cert_{uuid.uuid4()}_{timestamp}.jpg")
+        doc_types.append("Birth Certificate")
+    return {
+        "keys": keys,
+        "document_types": doc_types,
+        "id_key": keys[0],
+        "birth_key": keys[1] if len(keys) > 1 else None
+    }
+
+async def _ingest_documents(documents: List[UploadFile]) -> Dict:
+    """
+    Stream the uploads to temporary files and assign their S3 keys and document types
+
+    Uploads are validated (image signature, size limit) and hashed while they
+    are read; the caller must release them with _close_documents.
+
+    Returns:
+        Dict with the spooled files and their sha256, S3 keys, document types, id_key and birth_key
+    """
+    files: List[IngestedFile] = []
+    try:
+        for document in documents:
+            files.append(await ingest_upload(document))
+    except UploadRejectedError as e:
+        for file in files:
+            file.close()
+        raise _upload_rejected(e)
+    except BaseException:
+        for file in files:
+            file.close()
+        raise
+
+    return {
+        "files": files,
+        "sha256": [file.sha256 for file in files],
+        **_document_keys(len(files))
+    }
+
+def _close_documents(upload: Optional[Dict]) -> None:
+    """Remove the spooled upload files"""
+    for file in (upload or {}).get("files", []):
+        file.close()
+
+def _request_fingerprint(upload: Dict, params: Dict) -> str:
+    """Hash of the uploaded documents and request options, bound to an Idempotency-Key"""
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8"))
+    for document_hash in upload["sha256"]:
+        digest.update(document_hash.encode("ascii"))
+    return digest.hexdigest()
+
+async def _run_idempotent(
+    idempotency_store: IdempotencyStore,
+    idempotency_key: Optional[str],
+    upload: Dict,
+    params: Dict,
+    process: Callable[[], Awaitable[Dict]]
+) -> Dict:
+    """
+    Run process once per Idempotency-Key; resends wait for or replay the original response
+    """
+    if not idempotency_key:
+        return await process()
+    if len(idempotency_key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key must be at most 255 characters"
+        )
+    try:
+        return await idempotency_store.run(idempotency_key, _request_fingerprint(upload, params), process)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+async def _preprocess_documents(files: List[IngestedFile]) -> List[PreprocessedImage]:
+    """Shrink the images before they are sent for OCR (decoded straight from the spooled files)"""
+    return list(await asyncio.gather(*(preprocess_document_image_async(file.path) for file in files)))
+
+async def _fetch_uploaded_documents(keys: List[str], face_service: FaceVerificationService) -> List[bytes]:
+    """
+    Download documents the client uploaded through presigned policies,
+    applying the same size and image signature checks as direct uploads
+    """
+    try:
+        contents = await asyncio.gather(*(face_service.download_from_s3(key) for key in keys))
+    except UploadRejectedError as e:
+        raise _upload_rejected(e)
+    for key, content in zip(keys, contents):
+        if detect_image_type(content[:16]) is None:
+            raise _upload_rejected(UploadRejectedError(f"Upload {key} is not a JPEG, PNG or GIF image"))
+    return list(contents)
+
+async def _extract_prepared(
+    prepared: List[PreprocessedImage],
+    document_types: List[str],
+    processor: MultiDocumentProcessor,
+    face_service: FaceVerificationService,
+    combined_extraction: Optional[bool],
+    extraction_profile: Optional[str],
+    session_id: str
+):
+    """Extract information from all documents while the ID face is cropped"""
+    images = await asyncio.gather(*(encode_image_to_base64_async(image.data) for image in prepared))
+    return await asyncio.gather(
+        processor.extract_documents(
+            images=list(images),
+            document_types=document_types,
+            combined=combined_extraction,
+            profile=extraction_profile,
+            image_hashes=[image.phash for image in prepared],
+            session_id=session_id
+        ),
+        face_service.crop_document_face_base64(prepared[0].data)
+    )
+
+def _extraction_response(session_id: str, extraction) -> Dict:
+    """Response body of a completed document extraction"""
+    results = extraction.results
+    return {
+        "session_id": session_id,
+        "status": "success",
+        "extracted_info": {
+            "id_card": results[0].document_info.dict() if results[0].document_info else {},
+            "birth_certificate": (
+                results[1].document_info.dict() if len(results) > 1 and results[1].document_info else None
+            )
+        },
+        "document_consistency": extraction.consistency
+    }
+
+async def _discard_uploads(keys: List[str], face_service: FaceVerificationService) -> None:
+    """Best-effort removal of documents stored for a request that failed"""
+    results = await asyncio.gather(
+        *(face_service.delete_from_s3(key) for key in keys),
+        return_exceptions=True
+    )
+    for key, result in zip(keys, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Could not clean up S3 object {key}: {str(result)}")
+
+async def _store_documents(upload: Dict, face_service: FaceVerificationService) -> None:
+    """
+    Store the documents in S3; if any upload fails, or the request is
+    cancelled, the rest are cancelled and stored documents are removed
+    """
+    upload_task = asyncio.ensure_future(asyncio.gather(*(
+        face_service.upload_file_to_s3(file.path, key, file.media_type)
+        for file, key in zip(upload["files"], upload["keys"])
+    )))
+    try:
+        await upload_task
+    except BaseException:
+        upload_task.cancel()
+        await asyncio.gather(upload_task, return_exceptions=True)
+        await _discard_uploads(upload["keys"], face_service)
+        raise
+
+async def _with_document_uploads(
+    upload: Dict,
+    face_service: FaceVerificationService,
+    work: Awaitable
+):
+    """
+    Store the documents in S3 while work (pre-processing/OCR) runs
+
+    Storage and extraction do not depend on each other, so latency is roughly
+    max(upload, work) instead of their sum. If either side fails, or the request
+    is cancelled, the other side is cancelled and stored documents are removed.
+
+    Returns:
+        The result of work
+    """
+    started = time.perf_counter()
+    upload_task = asyncio.ensure_future(asyncio.gather(*(
+        face_service.upload_file_to_s3(file.path, key, file.media_type)
+        for file, key in zip(upload["files"], upload["keys"])
+    )))
+    work_task = asyncio.ensure_future(work)
+    try:
+        done, _ = await asyncio.wait({upload_task, work_task}, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        return work_task.result()
+    except BaseException:
+        upload_task.cancel()
+        work_task.cancel()
+        await asyncio.gather(upload_task, work_task, return_exceptions=True)
+        await _discard_uploads(upload["keys"], face_service)
+        raise
+    finally:
+        metrics.observe("extract_documents.pipeline", time.perf_counter() - started)
 
 @router.post(
     "/extract-documents", 
@@ -44,106 +294,315 @@ registration_sessions = {}
 async def extract_document_info(
     documents: List[UploadFile] = File(..., description="1-2 document images to process"),
     document_types: Optional[List[str]] = None,
-    verification_service: VerificationService = Depends(Provide[Container.verification_service])
+    combined_extraction: Optional[bool] = None,
+    extraction_profile: Optional[str] = None,
+    verification_service: VerificationService = Depends(Provide[Container.verification_service]),
+    processor: MultiDocumentProcessor = Depends(Provide[Container.document_processor]),
+    face_service: FaceVerificationService = Depends(Provide[Container.face_verification_service]),
+    session_store: SessionStore = Depends(Provide[Container.session_store]),
+    idempotency_store: IdempotencyStore = Depends(Provide[Container.idempotency_store]),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
 ):
     """
     Step 1: Document Upload and Information Extraction
     - Extracts information from documents using Claude
     - Stores documents in S3
     - Creates registration session
+    - Resends with the same Idempotency-Key get the original response
     """
     logger.info("Starting document extraction process")
+    _validate_document_upload(documents, extraction_profile)
     
-    # Validate file inputs
-    if len(documents) > 2:
-        logger.error("Maximum 2 documents allowed")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Maximum 2 documents allowed"
-        )
-    
-    # Validate file types
-    allowed_types = {'image/jpeg', 'image/png', 'image/gif'}
-    for file in documents:
-        if file.content_type not in allowed_types:
-            logger.error(f"Unsupported file type: {file.content_type}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unsupported file type: {file.content_type}"
-            )
-    
+    upload = None
     try:
-        # Initialize services
-        face_service = FaceVerificationService()
-        
-        # Process first document (ID Card)
-        logger.info("Processing ID card")
-        id_content = await documents[0].read()
-        
-        # Store ID card in S3
-        id_key = f"documents/id_card_{uuid.uuid4()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-        id_path = await face_service.upload_to_s3(id_content, id_key)
+        upload = await _ingest_documents(documents)
+
+        async def _process() -> Dict:
+            session_id = str(uuid.uuid4())
+
+            async def _extract():
+                prepared = await _preprocess_documents(upload["files"])
+                return await _extract_prepared(
+                    prepared, upload["document_types"], processor, face_service,
+                    combined_extraction, extraction_profile, session_id
+                )
+
+            extraction, id_face_crop = await _with_document_uploads(upload, face_service, _extract())
         
-        # Convert to base64 for OCR
-        id_base64 = encode_image_to_base64(id_content)
+            # Create registration session
+            logger.info(f"Creating registration session: {session_id}")
         
-        # Process documents
-        processor = MultiDocumentProcessor()
-        image_bases = [id_base64]
-        doc_types = ["ID Card"]
+            # Store session data
+            await session_store.create(session_id, {
+                **verification_service.build_document_session(
+                    extraction, upload["id_key"], upload["birth_key"], id_face_crop
+                ),
+                "created_at": datetime.now().isoformat()
+            })
         
-        # Handle second document if provided
-        birth_cert_path = None
-        if len(documents) > 1:
-            logger.info("Processing birth certificate")
-            birth_content = await documents[1].read()
-            
-            # Store birth certificate in S3
-            birth_key = f"documents/birth_cert_{uuid.uuid4()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-            birth_cert_path = await face_service.upload_to_s3(birth_content, birth_key)
-            
-            # Add to processing queue
-            birth_base64 = encode_image_to_base64(birth_content)
-            image_bases.append(birth_base64)
-            doc_types.append("Birth Certificate")
+            logger.success(f"Document extraction completed for session: {session_id}")
+            return _extraction_response(session_id, extraction)
+
+        return await _run_idempotent(
+            idempotency_store, idempotency_key, upload,
+            {"route": "extract-documents", "combined": combined_extraction, "profile": extraction_profile},
+            _process
+        )
         
-        # Extract information from all documents
-        results = await processor.process_documents(
-            images=image_bases,
-            document_types=doc_types
+    except (HTTPException, ServiceUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Document extraction failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing documents: {str(e)}"
+        )
+    finally:
+        _close_documents(upload)
+
+@router.post(
+    "/extract-documents/jobs",
+    response_model=Dict,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Queue document extraction and initiate registration",
+    description="Upload ID documents; extraction runs in the background and is polled via registration-status"
+)
+@inject
+async def submit_document_extraction_job(
+    documents: List[UploadFile] = File(..., description="1-2 document images to process"),
+    combined_extraction: Optional[bool] = None,
+    extraction_profile: Optional[str] = None,
+    job_service: OCRJobService = Depends(Provide[Container.ocr_job_service]),
+    face_service: FaceVerificationService = Depends(Provide[Container.face_verification_service]),
+    session_store: SessionStore = Depends(Provide[Container.session_store]),
+    idempotency_store: IdempotencyStore = Depends(Provide[Container.idempotency_store]),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
+):
+    """
+    Step 1 (asynchronous): Document Upload and queued Information Extraction
+    - Stores documents in S3
+    - Creates registration session in the "documents_queued" state
+    - Enqueues the OCR job (document S3 keys only) and returns immediately;
+      pre-processing, OCR and the ID face crop run in the worker
+    - Resends with the same Idempotency-Key get the original job
+    """
+    logger.info("Starting asynchronous document extraction")
+    _validate_document_upload(documents, extraction_profile)
+
+    upload = None
+    try:
+        upload = await _ingest_documents(documents)
+
+        async def _process() -> Dict:
+            # The worker fetches the documents back from S3, so the queued job stays small
+            await _store_documents(upload, face_service)
+
+            session_id = str(uuid.uuid4())
+            await session_store.create(session_id, {
+                "status": "documents_queued",
+                "job_id": session_id,
+                "created_at": datetime.now().isoformat()
+            })
+
+            try:
+                await job_service.submit(OCRJob(
+                    job_id=session_id,
+                    session_id=session_id,
+                    document_keys=upload["keys"],
+                    document_types=upload["document_types"],
+                    id_key=upload["id_key"],
+                    birth_key=upload["birth_key"],
+                    combined=combined_extraction,
+                    profile=extraction_profile
+                ))
+            except QueueFullError as e:
+                await session_store.delete(session_id)
+                await _discard_uploads(upload["keys"], face_service)
+                logger.error(f"Could not enqueue OCR job: {str(e)}")
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+            logger.success(f"Queued document extraction for session: {session_id}")
+            return {
+                "job_id": session_id,
+                "session_id": session_id,
+                "status": "documents_queued",
+                "status_url": f"{router.prefix}/registration-status/{session_id}"
+            }
+
+        return await _run_idempotent(
+            idempotency_store, idempotency_key, upload,
+            {"route": "extract-documents/jobs", "combined": combined_extraction, "profile": extraction_profile},
+            _process
+        )
+
+    except (HTTPException, ServiceUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Document extraction job submission failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing documents: {str(e)}"
+        )
+    finally:
+        _close_documents(upload)
+
+async def _get_session(session_store: SessionStore, session_id: str, expected_status: str, detail: str) -> Dict:
+    """Load a session, 404 if it is missing and 400 if it is not in expected_status"""
+    session = await session_store.get(session_id)
+    if session is None:
+        logger.error(f"Invalid session ID: {session_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invalid or expired session"
+        )
+    if session["status"] != expected_status:
+        logger.error(f"Invalid session status for {expected_status} step: {session['status']}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return session
+
+async def _record_face_verification(session_id: str, face_result, session_store: SessionStore) -> Dict:
+    """Move the session to face_verified after a biometric check, or raise if it failed"""
+    if not face_result.success:
+        logger.error(f"Face verification failed: {face_result.message}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Face verification failed: {face_result.message}"
         )
         
-        # Create registration session
+    # Update session, unless a concurrent request already moved it on
+    updated = await session_store.transition(session_id, "documents_verified", {
+        "status": "face_verified",
+        "selfie_path": face_result.details["selfie_path"],
+        "face_match_score": face_result.details["face_match_score"]
+    })
+    if not updated:
+        logger.error(f"Session {session_id} changed during face verification")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Session was updated by another request or has expired"
+        )
+    
+    logger.success(f"Face verification completed for session: {session_id}")
+    return {
+        "status": "success",
+        "message": "Face verification successful",
+        "match_score": face_result.details["face_match_score"]
+    }
+
+@router.post(
+    "/extract-documents/presign",
+    response_model=Dict,
+    summary="Issue direct-to-S3 upload policies for ID documents",
+    description=(
+        "Creates a registration session and returns presigned POST policies for its documents. "
+        "Upload each image to its url with the returned fields, a Content-Type field and the file, "
+        "then call /extract-documents/{session_id}/s3."
+    )
+)
+@inject
+async def presign_document_uploads(
+    include_birth_certificate: bool = False,
+    face_service: FaceVerificationService = Depends(Provide[Container.face_verification_service]),
+    session_store: SessionStore = Depends(Provide[Container.session_store])
+) -> Dict:
+    """
+    Step 1a (direct upload): Issue S3 upload policies
+    - Creates registration session in the "awaiting_documents" state
+    - Document bytes go straight to S3 instead of through the API
+    """
+    try:
+        documents = _document_keys(2 if include_birth_certificate else 1)
+        uploads = [
+            {"document_type": document_type, "key": key, **face_service.generate_presigned_upload(key)}
+            for document_type, key in zip(documents["document_types"], documents["keys"])
+        ]
+
         session_id = str(uuid.uuid4())
-        logger.info(f"Creating registration session: {session_id}")
-        
-        # Store session data
-        registration_sessions[session_id] = {
-            "id_card_info": results[0].document_info.dict() if results[0].document_info else {},
-            "id_photo_path": id_key,  # S3 key for face comparison
-            "status": "documents_verified",
+        await session_store.create(session_id, {
+            "status": "awaiting_documents",
+            "document_uploads": {"id_card": documents["id_key"], "birth_certificate": documents["birth_key"]},
             "created_at": datetime.now().isoformat()
-        }
-        
-        # Add birth certificate info if provided
-        if birth_cert_path and len(results) > 1:
-            registration_sessions[session_id]["birth_cert_info"] = (
-                results[1].document_info.dict() if results[1].document_info else {}
+        })
+        logger.info(f"Issued {len(uploads)} document upload policies for session: {session_id}")
+        return {"session_id": session_id, "uploads": uploads}
+
+    except Exception as e:
+        logger.error(f"Could not issue document upload policies: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error issuing upload policies: {str(e)}"
+        )
+
+@router.post(
+    "/extract-documents/{session_id}/s3",
+    response_model=Dict,
+    summary="Extract information from ID cards uploaded directly to S3",
+    description="Runs extraction on documents uploaded through /extract-documents/presign"
+)
+@inject
+async def extract_uploaded_documents(
+    session_id: str,
+    request: S3DocumentExtractionRequest,
+    verification_service: VerificationService = Depends(Provide[Container.verification_service]),
+    processor: MultiDocumentProcessor = Depends(Provide[Container.document_processor]),
+    face_service: FaceVerificationService = Depends(Provide[Container.face_verification_service]),
+    session_store: SessionStore = Depends(Provide[Container.session_store])
+) -> Dict:
+    """
+    Step 1b (direct upload): Information Extraction
+    - Only accepts the keys issued for this session
+    - Fetches the documents from S3 for OCR; nothing is re-uploaded
+    - A failed extraction returns the session to "awaiting_documents" so it can be retried
+    """
+    logger.info(f"Starting extraction of uploaded documents for session: {session_id}")
+    try:
+        get_extraction_profile(request.extraction_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        session = await _get_session(
+            session_store, session_id, "awaiting_documents",
+            "Documents were already submitted for this session"
+        )
+        issued = session["document_uploads"]
+        if request.id_card_key != issued["id_card"] or (
+            request.birth_certificate_key is not None
+            and request.birth_certificate_key != issued["birth_certificate"]
+        ):
+            logger.error(f"Document keys were not issued for session {session_id}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Document keys do not match the upload policies issued for this session"
             )
-            registration_sessions[session_id]["birth_cert_path"] = birth_key
-        
+
+        # Claim the session so a resent request cannot extract the same documents twice
+        if not await session_store.transition(session_id, "awaiting_documents", {"status": "documents_processing"}):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Documents for this session are already being processed"
+            )
+
+        keys = [key for key in (request.id_card_key, request.birth_certificate_key) if key]
+        try:
+            contents = await _fetch_uploaded_documents(keys, face_service)
+            prepared = list(await asyncio.gather(*(preprocess_document_image_async(content) for content in contents)))
+            extraction, id_face_crop = await _extract_prepared(
+                prepared, ["ID Card", "Birth Certificate"][:len(keys)], processor, face_service,
+                request.combined_extraction, request.extraction_profile, session_id
+            )
+        except BaseException:
+            await session_store.transition(session_id, "documents_processing", {"status": "awaiting_documents"})
+            raise
+
+        await session_store.transition(session_id, "documents_processing", verification_service.build_document_session(
+            extraction, request.id_card_key, request.birth_certificate_key, id_face_crop
+        ))
         logger.success(f"Document extraction completed for session: {session_id}")
-        return {
-            "session_id": session_id,
-            "status": "success",
-            "extracted_info": {
-                "id_card": results[0].document_info.dict() if results[0].document_info else {},
-                "birth_certificate": (
-                    results[1].document_info.dict() if len(results) > 1 and results[1].document_info else None
-                )
-            }
-        }
-        
+        return _extraction_response(session_id, extraction)
+
+    except (HTTPException, ServiceUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Document extraction failed: {str(e)}")
         raise HTTPException(
@@ -156,7 +615,8 @@ async def extract_document_info(
 async def verify_face(
     session_id: str,
     selfie: UploadFile = File(...),
-    verification_service: VerificationService = Depends(Provide[Container.verification_service])
+    verification_service: VerificationService = Depends(Provide[Container.verification_service]),
+    session_store: SessionStore = Depends(Provide[Container.session_store])
 ) -> Dict:
     """
     Verify user's face against ID photo
@@ -164,14 +624,14 @@ async def verify_face(
     """
     logger.info(f"Starting face verification for session: {session_id}")
     try:
-        if session_id not in registration_sessions:
+        session = await session_store.get(session_id)
+        if session is None:
             logger.error(f"Invalid session ID: {session_id}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Invalid session ID"
             )
             
-        session = registration_sessions[session_id]
         if session["status"] != "documents_verified":
             logger.error(f"Invalid session status for face verification: {session['status']}")
             raise HTTPException(
@@ -179,35 +639,101 @@ async def verify_face(
                 detail="Documents must be verified before face verification"
             )
         
-        # Process selfie
+        # Process selfie; validated and size-capped like document uploads
         logger.info("Processing selfie image")
-        selfie_bytes = await selfie.read()
+        try:
+            selfie_file = await ingest_upload(selfie)
+        except UploadRejectedError as e:
+            raise _upload_rejected(e)
+        try:
+            selfie_bytes = await asyncio.to_thread(selfie_file.read)
+        finally:
+            selfie_file.close()
         face_result = await verification_service.verify_biometrics(
             selfie_bytes,
-            session["id_photo_path"]  # Using ID photo path for comparison
+            session["id_photo_path"],  # Using ID photo path for comparison
+            id_face_crop=session.get("id_face_crop")
         )
         
-        if not face_result.success:
-            logger.error(f"Face verification failed: {face_result.message}")
+        return await _record_face_verification(session_id, face_result, session_store)
+        
+    except (HTTPException, ServiceUnavailableError):
+        raise
+    except Exception as e:
+        error_msg = f"Face verification failed: {str(e)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=500, detail=error_msg)
+
+@router.post("/verify-face/{session_id}/presign")
+@inject
+async def presign_selfie_upload(
+    session_id: str,
+    face_service: FaceVerificationService = Depends(Provide[Container.face_verification_service]),
+    session_store: SessionStore = Depends(Provide[Container.session_store])
+) -> Dict:
+    """
+    Issue a direct-to-S3 upload policy for the session's selfie
+    Upload the selfie with it, then call /verify-face/{session_id}/s3
+    """
+    try:
+        await _get_session(
+            session_store, session_id, "documents_verified",
+            "Documents must be verified before face verification"
+        )
+        key = f"selfies/{uuid.uuid4()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+        upload = face_service.generate_presigned_upload(key)
+        if not await session_store.transition(session_id, "documents_verified", {"selfie_upload_key": key}):
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Face verification failed: {face_result.message}"
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Session was updated by another request or has expired"
             )
-            
-        # Update session
-        session["status"] = "face_verified"
-        session["selfie_path"] = face_result.details["selfie_path"]
-        session["face_match_score"] = face_result.details["face_match_score"]
-        
-        logger.success(f"Face verification completed for session: {session_id}")
-        return {
-            "status": "success",
-            "message": "Face verification successful",
-            "match_score": face_result.details["face_match_score"]
-        }
-        
+        logger.info(f"Issued selfie upload policy for session: {session_id}")
+        return {"key": key, **upload}
+
     except HTTPException:
         raise
+    except Exception as e:
+        logger.error(f"Could not issue selfie upload policy: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error issuing upload policy: {str(e)}"
+        )
+
+@router.post("/verify-face/{session_id}/s3")
+@inject
+async def verify_uploaded_face(
+    session_id: str,
+    request: S3FaceVerificationRequest,
+    verification_service: VerificationService = Depends(Provide[Container.verification_service]),
+    session_store: SessionStore = Depends(Provide[Container.session_store])
+) -> Dict:
+    """
+    Verify a selfie uploaded directly to S3 against the ID photo
+    Rekognition reads the selfie from S3; the API never downloads it
+    """
+    logger.info(f"Starting face verification of uploaded selfie for session: {session_id}")
+    try:
+        session = await _get_session(
+            session_store, session_id, "documents_verified",
+            "Documents must be verified before face verification"
+        )
+        if request.selfie_key != session.get("selfie_upload_key"):
+            logger.error(f"Selfie key was not issued for session {session_id}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Selfie key does not match the upload policy issued for this session"
+            )
+
+        face_result = await verification_service.verify_biometrics(
+            None,
+            session["id_photo_path"],
+            id_face_crop=session.get("id_face_crop"),
+            selfie_key=request.selfie_key
+        )
+        return await _record_face_verification(session_id, face_result, session_store)
+
+    except (HTTPException, ServiceUnavailableError):
+        raise
     except Exception as e:
         error_msg = f"Face verification failed: {str(e)}"
         logger.error(error_msg)
@@ -220,7 +746,8 @@ async def register_customer(
     background_tasks: BackgroundTasks,
     customer_data: CustomerCreateRequest,
     verification_service: VerificationService = Depends(Provide[Container.verification_service]),
-    customer_service: CustomerService = Depends(Provide[Container.customer_service])
+    customer_service: CustomerService = Depends(Provide[Container.customer_service]),
+    session_store: SessionStore = Depends(Provide[Container.session_store])
 ) -> CustomerResponse:
     """
     Step 3: Complete Registration
@@ -229,44 +756,58 @@ async def register_customer(
     """
     logger.info(f"Starting customer registration for session: {session_id}")
     try:
-        if session_id not in registration_sessions:
+        session = await session_store.get(session_id)
+        if session is None:
             logger.error(f"Invalid session ID: {session_id}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Invalid or expired session"
             )
             
-        session = registration_sessions[session_id]
         if session["status"] != "face_verified":
             logger.error(f"Invalid session status for registration: {session['status']}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Complete document and face verification first"
             )
-        
-        # Create customer with verified information
-        logger.info("Completing verification and creating customer record")
-        result = await verification_service.complete_verification(
-            session=session,
-            customer_data=customer_data
-        )
-        
-        if not result.success:
-            logger.error(f"Registration failed: {result.message}")
+
+        # Claim the session so a concurrent request cannot register it twice
+        if not await session_store.transition(session_id, "face_verified", {"status": "registering"}):
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=result.message
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Registration is already in progress for this session"
             )
         
-        # Create customer record
-        customer_response = await customer_service.create_customer(customer_data)
+        try:
+            # Create customer with verified information
+            logger.info("Completing verification and creating customer record")
+            result = await verification_service.complete_verification(
+                session=session,
+                customer_data=customer_data
+            )
+            
+            if not result.success:
+                logger.error(f"Registration failed: {result.message}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=result.message
+                )
+            
+            # Create customer record
+            customer_response = await customer_service.create_customer(customer_data)
+        except BaseException:
+            # Release the claim so the registration can be retried
+            await session_store.transition(session_id, "registering", {"status": "face_verified"})
+            raise
         
         # Clean up session in background
-        background_tasks.add_task(registration_sessions.pop, session_id, None)
+        background_tasks.add_task(session_store.delete, session_id)
         
         logger.success(f"Customer registration completed. Customer ID: {customer_response.customer_id}")
         return customer_response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Registration failed: {str(e)}")
         raise HTTPException(
@@ -275,27 +816,36 @@ async def register_customer(
         )
 
 @router.get("/registration-status/{session_id}")
-async def get_registration_status(session_id: str) -> Dict:
+@inject
+async def get_registration_status(
+    session_id: str,
+    session_store: SessionStore = Depends(Provide[Container.session_store])
+) -> Dict:
     """Get current registration session status"""
     logger.info(f"Fetching registration status for session: {session_id}")
     try:
-        if session_id not in registration_sessions:
+        session = await session_store.get(session_id)
+        if session is None:
             logger.error(f"Invalid session ID: {session_id}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Invalid or expired session"
             )
-            
-        session = registration_sessions[session_id]
         
         logger.info(f"Retrieved status for session {session_id}: {session['status']}")
         return {
             "status": session["status"],
-            "document_info": session.get("document_info"),
-            "has_additional_doc": "document2_info" in session,
+            "job_id": session.get("job_id"),
+            "document_info": session.get("id_card_info"),
+            "birth_certificate_info": session.get("birth_cert_info"),
+            "document_consistency": session.get("document_consistency"),
+            "error": session.get("error"),
+            "has_additional_doc": "birth_cert_info" in session,
             "has_selfie": "selfie_path" in session
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get registration status: {str(e)}")
         raise HTTPException(
@@ -11,4 +11,13 @@ class CustomerUpdateRequest(BaseModel):
     name: Optional[str] = None
     email: Optional[EmailStr] = None 
     phone: Optional[str] = None
-    address: Optional[str] = None
\ No newline at end of file
+    address: Optional[str] = None
+
+class S3DocumentExtractionRequest(BaseModel):
+    id_card_key: str
+    birth_certificate_key: Optional[str] = None
+    combined_extraction: Optional[bool] = None
+    extraction_profile: Optional[str] = None
+
+class S3FaceVerificationRequest(BaseModel):
+    selfie_key: str
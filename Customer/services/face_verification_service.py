@@ -1,32 +1,204 @@
+import asyncio
+import functools
+import time
 import boto3
-from typing import Dict, Optional, Tuple
-from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError, ParamValidationError
 from Library.config import settings
+from Library.image_quality import prescreen_selfie_async
+from Library.image_processing import crop_face_region
+from Library.ingestion import UploadRejectedError
+from Library.metrics import metrics
+from Library.resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, ServiceUnavailableError
+from Library.utils import encode_image_to_base64, run_image_task
 from loguru import logger
 
+# Rekognition rejects inline image bytes larger than this; bigger images must be read from S3
+REKOGNITION_MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# AWS error codes meaning "slow down" (the call may succeed later)
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException', 'ProvisionedThroughputExceededException', 'LimitExceededException',
+    'TooManyRequestsException', 'RequestLimitExceeded', 'SlowDown', 'Throttling',
+}
+
+
+def _underlying_aws_error(error: BaseException) -> BaseException:
+    """
+    The ClientError behind a wrapper such as boto3's S3UploadFailedError, or error itself
+    """
+    cause = error
+    while cause is not None and not isinstance(cause, ClientError):
+        cause = cause.__cause__ or cause.__context__
+    return cause if cause is not None else error
+
+
+def _aws_error_kind(error: BaseException) -> str:
+    """
+    Classify an AWS failure for the limiter and circuit breaker
+
+    Returns:
+        str: "throttled", "degraded" (5xx/connection problems) or "client" (bad input)
+    """
+    error = _underlying_aws_error(error)
+    if isinstance(error, ParamValidationError):
+        return "client"
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        if code in THROTTLING_ERROR_CODES or status == 429:
+            return "throttled"
+        if status >= 500 or code in ('InternalServerError', 'ServiceUnavailableException'):
+            return "degraded"
+        return "client"
+    # EndpointConnectionError, ReadTimeoutError and other transport failures
+    return "degraded"
+
+
+def _megabytes(size: int) -> int:
+    """Size limit in whole megabytes for user-facing messages"""
+    return size // (1024 * 1024)
+
+
+def create_aws_client(service_name: str):
+    """
+    Create a boto3 client with a connection pool sized for concurrent requests
+
+    Honours settings.aws_endpoint_url so the service can run against moto or a local stub.
+    """
+    return boto3.client(
+        service_name,
+        aws_access_key_id=settings.aws_access_key_id,
+        aws_secret_access_key=settings.aws_secret_access_key,
+        region_name=settings.aws_region,
+        endpoint_url=settings.aws_endpoint_url,
+        config=Config(
+            max_pool_connections=settings.aws_max_pool_connections,
+            retries={'max_attempts': 3, 'mode': 'standard'}
+        )
+    )
+
+
 class FaceVerificationService:
-    def __init__(self):
-        """Initialize AWS Rekognition client"""
+    def __init__(
+        self,
+        rekognition_client=None,
+        s3_client=None,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        """
+        Initialize AWS Rekognition and S3 clients
+
+        boto3 is synchronous, so every AWS call runs on a bounded thread pool
+        instead of the event loop. The pool is sized to match the clients'
+        connection pools.
+
+        Args:
+            rekognition_client: Optional pre-built Rekognition client (e.g. a moto/stub client)
+            s3_client: Optional pre-built S3 client
+            executor (Optional[ThreadPoolExecutor]): Optional executor for the blocking calls
+        """
         logger.info("Initializing FaceVerificationService")
         try:
-            self.rekognition = boto3.client(
-                'rekognition',
-                aws_access_key_id=settings.aws_access_key_id,
-                aws_secret_access_key=settings.aws_secret_access_key,
-                region_name=settings.aws_region
-            )
-            self.s3 = boto3.client(
-                's3',
-                aws_access_key_id=settings.aws_access_key_id,
-                aws_secret_access_key=settings.aws_secret_access_key,
-                region_name=settings.aws_region
-            )
+            # boto3 clients are thread-safe, so one pooled pair is shared by all workers
+            self.rekognition = rekognition_client or create_aws_client('rekognition')
+            self.s3 = s3_client or create_aws_client('s3')
             self.bucket_name = settings.aws_bucket_name
+            self._owns_executor = executor is None
+            self.executor = executor or ThreadPoolExecutor(
+                max_workers=settings.aws_executor_workers,
+                thread_name_prefix="aws"
+            )
+            # One adaptive limit and breaker per AWS service, since throttling is per service
+            self.limiters = {
+                service: AdaptiveConcurrencyLimiter(
+                    f"aws.{service}",
+                    initial_limit=settings.aws_limiter_initial_limit,
+                    min_limit=settings.aws_limiter_min_limit,
+                    max_limit=settings.aws_executor_workers
+                )
+                for service in ('s3', 'rekognition')
+            }
+            self.breakers = {
+                service: CircuitBreaker(
+                    f"aws.{service}",
+                    failure_threshold=settings.aws_circuit_failure_threshold,
+                    recovery_timeout=settings.aws_circuit_recovery_seconds
+                )
+                for service in ('s3', 'rekognition')
+            }
             logger.info("Successfully initialized AWS clients")
         except Exception as e:
             logger.error(f"Failed to initialize AWS clients: {str(e)}")
             raise
 
+    async def _call_aws(self, operation: str, fn: Callable[..., Any], **kwargs) -> Any:
+        """
+        Run a blocking boto3 call on the AWS executor, behind the service's
+        circuit breaker and adaptive concurrency limit
+
+        Args:
+            operation (str): Metrics name of the operation, e.g. "s3.put_object"
+            fn: boto3 client method
+            **kwargs: Arguments for the call
+
+        Returns:
+            Any: The boto3 response
+
+        Raises:
+            ServiceUnavailableError: If the service is throttling or the circuit is open
+        """
+        service = operation.split('.')[0]
+        limiter, breaker = self.limiters[service], self.breakers[service]
+        loop = asyncio.get_running_loop()
+
+        # Take the slot first so a cancelled wait can never leave a half-open probe claimed
+        await limiter.acquire()
+        started = time.perf_counter()
+        kind = "rejected"
+        try:
+            breaker.before_call()
+            kind = "cancelled"
+            response = await loop.run_in_executor(self.executor, functools.partial(fn, **kwargs))
+            kind = "success"
+            breaker.record_success()
+            return response
+        except Exception as e:
+            if kind == "rejected":
+                raise
+            kind = _aws_error_kind(e)
+            if kind == "client":
+                breaker.record_neutral()
+                cause = _underlying_aws_error(e)
+                if cause is not e:
+                    # Surface the ClientError itself so callers' error-code handling applies
+                    raise cause from e
+                raise
+            if kind == "throttled":
+                # Throttling is handled by shrinking the concurrency limit, not by opening the circuit
+                breaker.record_neutral()
+            else:
+                breaker.record_failure()
+            raise ServiceUnavailableError(
+                f"AWS {service} is {kind}: {str(e)}",
+                retry_after=max(1.0, breaker.retry_after())
+            ) from e
+        finally:
+            if kind == "cancelled":
+                # CancelledError or another BaseException: release a half-open probe we hold
+                breaker.record_neutral()
+            limiter.release(throttled=kind == "throttled", succeeded=kind in ("success", "client"))
+            if kind != "rejected":
+                metrics.observe(f"aws.{operation}", time.perf_counter() - started)
+
+    def close(self) -> None:
+        """Shut down the AWS executor if this service created it"""
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
     async def upload_to_s3(self, image_bytes: bytes, key: str) -> str:
         """
         Upload image to S3 bucket
@@ -40,7 +212,9 @@ class FaceVerificationService:
         """
         logger.info(f"Uploading image to S3 with key: {key}")
         try:
-            self.s3.put_object(
+            await self._call_aws(
+                "s3.put_object",
+                self.s3.put_object,
                 Bucket=self.bucket_name,
                 Key=key,
                 Body=image_bytes,
@@ -54,20 +228,234 @@ class FaceVerificationService:
             logger.error(error_msg)
             raise Exception(error_msg)
 
-    async def verify_face_quality(self, image_bytes: bytes) -> Tuple[bool, Dict]:
+    async def upload_file_to_s3(self, file_path: str, key: str, content_type: str = 'image/jpeg') -> str:
+        """
+        Stream a file to S3, using a multipart upload above s3_multipart_threshold_bytes
+
+        Args:
+            file_path: Path of the file to upload (e.g. a spooled upload)
+            key: S3 object key (path/filename)
+            content_type: MIME type stored with the object
+
+        Returns:
+            str: S3 URI of uploaded file
+        """
+        logger.info(f"Streaming file to S3 with key: {key}")
+        transfer_config = TransferConfig(
+            multipart_threshold=settings.s3_multipart_threshold_bytes,
+            multipart_chunksize=settings.s3_multipart_chunk_bytes,
+            # Already running on the bounded AWS executor
+            use_threads=False
+        )
+        try:
+            await self._call_aws(
+                "s3.upload_file",
+                self.s3.upload_file,
+                Filename=file_path,
+                Bucket=self.bucket_name,
+                Key=key,
+                ExtraArgs={'ContentType': content_type},
+                Config=transfer_config
+            )
+            s3_uri = f"s3://{self.bucket_name}/{key}"
+            logger.success(f"Successfully uploaded file to {s3_uri}")
+            return s3_uri
+        except ClientError as e:
+            error_msg = f"Failed to upload file to S3: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+    async def delete_from_s3(self, key: str) -> None:
+        """
+        Delete an object from the S3 bucket
+
+        Args:
+            key: S3 object key (path/filename)
+        """
+        logger.info(f"Deleting S3 object with key: {key}")
+        try:
+            await self._call_aws(
+                "s3.delete_object",
+                self.s3.delete_object,
+                Bucket=self.bucket_name,
+                Key=key
+            )
+        except ClientError as e:
+            error_msg = f"Failed to delete S3 object {key}: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def generate_presigned_upload(
+        self,
+        key: str,
+        max_bytes: Optional[int] = None,
+        expires_in: Optional[int] = None
+    ) -> Dict:
+        """
+        Presigned POST policy that lets a client upload one image straight to S3
+
+        The policy pins the key, limits the size to max_bytes and only accepts
+        image content types, so the bytes never pass through the API.
+        Signing is local; no request is made to AWS.
+
+        Args:
+            key: S3 object key the client must upload to
+            max_bytes: Size limit, defaults to settings.max_upload_bytes
+            expires_in: Policy lifetime in seconds, defaults to settings.presigned_upload_expiry_seconds
+
+        Returns:
+            Dict: {"url", "fields", "expires_in"}; the client POSTs the fields plus a "file" part to url
+        """
+        max_bytes = max_bytes or settings.max_upload_bytes
+        expires_in = expires_in or settings.presigned_upload_expiry_seconds
+        presigned = self.s3.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=key,
+            Conditions=[
+                ["content-length-range", 1, max_bytes],
+                ["starts-with", "$Content-Type", "image/"]
+            ],
+            ExpiresIn=expires_in
+        )
+        metrics.incr("uploads.presigned")
+        return {"url": presigned["url"], "fields": presigned["fields"], "expires_in": expires_in}
+
+    def _read_object(self, key: str, max_bytes: int) -> Tuple[int, Optional[bytes]]:
+        response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
+        size = response['ContentLength']
+        if size > max_bytes:
+            # Do not pull an oversized object over the network just to reject it
+            response['Body'].close()
+            return size, None
+        return size, response['Body'].read()
+
+    async def download_from_s3(self, key: str, max_bytes: Optional[int] = None) -> bytes:
+        """
+        Fetch an object uploaded by a client through a presigned policy
+
+        Args:
+            key: S3 object key (path/filename)
+            max_bytes: Size limit, defaults to settings.max_upload_bytes
+
+        Returns:
+            bytes: Object content
+
+        Raises:
+            UploadRejectedError: If the object does not exist or exceeds max_bytes
+        """
+        max_bytes = max_bytes or settings.max_upload_bytes
+        logger.info(f"Downloading S3 object with key: {key}")
+        try:
+            size, content = await self._call_aws("s3.get_object", self._read_object, key=key, max_bytes=max_bytes)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                raise UploadRejectedError(f"No upload found for key {key}")
+            error_msg = f"Failed to download S3 object {key}: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+        if content is None:
+            raise UploadRejectedError(
+                f"File exceeds the maximum upload size of {max_bytes // (1024 * 1024)}MB",
+                too_large=True
+            )
+        metrics.incr("uploads.fetched_bytes", size)
+        return content
+
+    async def prescreen_selfie(self, image_bytes: bytes) -> Tuple[bool, Dict]:
+        """
+        Cheap local quality gate (size, resolution, brightness, sharpness) run
+        before any AWS call
+
+        Args:
+            image_bytes: Image data in bytes
+
+        Returns:
+            Tuple[bool, Dict]: (is_valid, details)
+        """
+        report = await prescreen_selfie_async(image_bytes)
+        return report.passed, {
+            "checks": report.checks,
+            "measurements": report.measurements,
+            "suggestions": self._generate_suggestions(report.checks)
+        }
+
+    async def crop_document_face(self, image_bytes: bytes) -> Optional[bytes]:
+        """
+        Detect the largest face on an ID document and return a small crop of it
+
+        The crop is stored with the registration session and sent as the
+        CompareFaces source on every selfie attempt, so Rekognition does not
+        re-read and re-detect the full ID card image each time.
+
+        Args:
+            image_bytes: Document image (pre-processed, under Rekognition's 5MB limit)
+
+        Returns:
+            Optional[bytes]: JPEG face crop, or None if no face could be found
+        """
+        logger.info("Detecting ID document face")
+        try:
+            response = await self._call_aws(
+                "rekognition.detect_faces",
+                self.rekognition.detect_faces,
+                Image={'Bytes': image_bytes},
+                Attributes=['DEFAULT']
+            )
+        except ClientError as e:
+            logger.warning(f"ID face detection failed, falling back to the full document: {str(e)}")
+            return None
+
+        faces = response.get('FaceDetails') or []
+        if not faces:
+            logger.warning("No face detected on the ID document")
+            return None
+
+        box = max(faces, key=lambda face: face['BoundingBox']['Width'] * face['BoundingBox']['Height'])['BoundingBox']
+        crop = await run_image_task(
+            crop_face_region,
+            image_bytes,
+            box,
+            max_dimension=settings.face_crop_max_dimension
+        )
+        logger.info(f"Cropped ID document face to {len(crop)} bytes")
+        return crop
+
+    async def crop_document_face_base64(self, image_bytes: bytes) -> Optional[str]:
+        """
+        Base64 crop of the ID card face for later selfie comparisons, or None to
+        fall back to comparing against the full document in S3
+        """
+        if not settings.face_crop_enabled:
+            return None
+        try:
+            crop = await self.crop_document_face(image_bytes)
+        except Exception as e:
+            logger.warning(f"ID face crop failed: {str(e)}")
+            return None
+        return encode_image_to_base64(crop) if crop else None
+
+    async def verify_face_quality(
+        self,
+        image_bytes: Optional[bytes] = None,
+        image_key: Optional[str] = None
+    ) -> Tuple[bool, Dict]:
         """
         Verify face quality using AWS Rekognition DetectFaces
         
         Args:
             image_bytes: Image data in bytes
+            image_key: S3 key of the image, read by Rekognition when image_bytes is not given
             
         Returns:
             Tuple[bool, Dict]: (is_valid, details)
         """
         logger.info("Verifying face quality")
         try:
-            response = self.rekognition.detect_faces(
-                Image={'Bytes': image_bytes},
+            response = await self._call_aws(
+                "rekognition.detect_faces",
+                self.rekognition.detect_faces,
+                Image=self._image_reference(image_key, image_bytes),
                 Attributes=['ALL']
             )
 
@@ -80,15 +468,11 @@ class FaceVerificationService:
 
             face_detail = response['FaceDetails'][0]
             
-            # Enhanced quality checks
+            # Enhanced quality checks; every check is True when it passed
             checks = {
                 "is_face_detected": True,
                 "is_human": face_detail.get('Confidence', 0) > 95,  # High confidence threshold for human face
-                "face_occluded": any([
-                    face_detail.get('Occlusions', []).get('EyesOccluded', {}).get('Value', False),
-                    face_detail.get('Occlusions', []).get('MouthOccluded', {}).get('Value', False),
-                    face_detail.get('Occlusions', []).get('NoseOccluded', {}).get('Value', False)
-                ]),
+                "face_not_occluded": not face_detail.get('FaceOccluded', {}).get('Value', False),
                 "pose_valid": all([
                     abs(face_detail.get('Pose', {}).get('Pitch', 0)) < 20,  # Face looking straight ahead
                     abs(face_detail.get('Pose', {}).get('Roll', 0)) < 20,   # Head not tilted
@@ -97,9 +481,9 @@ class FaceVerificationService:
                 "eyes_open": face_detail.get('EyesOpen', {}).get('Value', True),
                 "quality_brightness": face_detail.get('Quality', {}).get('Brightness', 0) > 50,
                 "quality_sharpness": face_detail.get('Quality', {}).get('Sharpness', 0) > 50,
-                "sunglasses": not face_detail.get('Sunglasses', {}).get('Value', False),
-                "mouth_open": not face_detail.get('MouthOpen', {}).get('Value', False),
-                "multiple_faces": len(response['FaceDetails']) == 1  # Only one face should be present
+                "no_sunglasses": not face_detail.get('Sunglasses', {}).get('Value', False),
+                "mouth_closed": not face_detail.get('MouthOpen', {}).get('Value', False),
+                "single_face": len(response['FaceDetails']) == 1  # Only one face should be present
             }
             
             is_valid = all(checks.values())
@@ -130,45 +514,69 @@ class FaceVerificationService:
             elif error_code == 'ImageTooLargeException':
                 return False, {
                     "error": "Image too large",
-                    "suggestions": ["Please provide an image smaller than 5MB"]
+                    "suggestions": [
+                        f"Please provide an image smaller than {_megabytes(settings.selfie_prescreen_max_bytes)}MB"
+                    ]
                 }
             else:
                 raise Exception(f"Face detection failed: {error_msg}")
 
     def _generate_suggestions(self, checks: Dict[str, bool]) -> list:
-        """Generate user-friendly suggestions based on failed checks"""
+        """
+        Generate user-friendly suggestions based on failed checks
+
+        Every check is True when it passed. Checks that were not run (e.g. face
+        checks during the local prescreen) count as passed.
+        """
         logger.info("Generating suggestions")
         suggestions = []
         
-        if not checks["is_face_detected"]:
+        if not checks.get("image_decodable", True):
+            suggestions.append("Please provide a valid JPEG or PNG image")
+        if not checks.get("file_size_valid", True):
+            suggestions.append(
+                f"Please provide an image between {settings.selfie_prescreen_min_bytes // 1024}KB "
+                f"and {_megabytes(settings.selfie_prescreen_max_bytes)}MB"
+            )
+        if not checks.get("resolution_valid", True):
+            suggestions.append("Please take the photo with a higher resolution camera")
+        if not checks.get("is_face_detected", True):
             suggestions.append("Please ensure your face is clearly visible in the image")
-        if not checks["is_human"]:
+        if not checks.get("is_human", True):
             suggestions.append("Please provide a clear photo of a human face")
-        if checks["face_occluded"]:
+        if not checks.get("face_not_occluded", True):
             suggestions.append("Please remove any objects blocking your face (hands, mask, etc.)")
-        if not checks["pose_valid"]:
+        if not checks.get("pose_valid", True):
             suggestions.append("Please look straight at the camera without tilting or turning your head")
-        if not checks["eyes_open"]:
+        if not checks.get("eyes_open", True):
             suggestions.append("Please open your eyes for the photo")
-        if not checks["quality_brightness"]:
+        if not checks.get("quality_brightness", True):
             suggestions.append("Please take the photo in better lighting")
-        if not checks["quality_sharpness"]:
+        if not checks.get("quality_sharpness", True):
             suggestions.append("Please hold the camera steady and ensure the image is clear")
-        if not checks["sunglasses"]:
+        if not checks.get("no_sunglasses", True):
             suggestions.append("Please remove sunglasses or any eye accessories")
-        if checks["mouth_open"]:
+        if not checks.get("mouth_closed", True):
             suggestions.append("Please close your mouth for the photo")
-        if not checks["multiple_faces"]:
+        if not checks.get("single_face", True):
             suggestions.append("Please ensure only your face is visible in the photo")
             
         logger.info(f"Generated {len(suggestions)} suggestions")
         return suggestions
 
+    def _image_reference(self, key: Optional[str], image_bytes: Optional[bytes]) -> Dict:
+        """Rekognition Image parameter: inline bytes when given, otherwise the S3 object"""
+        if image_bytes is not None:
+            return {'Bytes': image_bytes}
+        return {'S3Object': {'Bucket': self.bucket_name, 'Name': key}}
+
     async def compare_faces(
         self,
-        source_image_key: str,
-        target_image_key: str,
-        similarity_threshold: float = 90
+        source_image_key: Optional[str] = None,
+        target_image_key: Optional[str] = None,
+        similarity_threshold: float = 90,
+        target_image_bytes: Optional[bytes] = None,
+        source_image_bytes: Optional[bytes] = None
     ) -> Tuple[bool, float]:
         """
         Compare faces between source (ID card) and target (selfie) images
@@ -177,29 +585,28 @@ class FaceVerificationService:
             source_image_key: S3 key for source image (ID card)
             target_image_key: S3 key for target image (selfie)
             similarity_threshold: Minimum similarity threshold (0-100)
+            target_image_bytes: Selfie bytes, sent inline instead of reading target_image_key from S3
+            source_image_bytes: ID face crop, sent inline instead of reading source_image_key from S3
             
         Returns:
             Tuple[bool, float]: (match_found, similarity_score)
         """
+        if target_image_key is None and target_image_bytes is None:
+            raise ValueError("Either target_image_key or target_image_bytes is required")
+        if source_image_key is None and source_image_bytes is None:
+            raise ValueError("Either source_image_key or source_image_bytes is required")
         logger.info(
-            f"Comparing faces: source={source_image_key}, target={target_image_key}, "
+            f"Comparing faces: source={'<face crop>' if source_image_bytes is not None else source_image_key}, "
+            f"target={'<bytes>' if target_image_bytes is not None else target_image_key}, "
             f"threshold={similarity_threshold}"
         )
         
         try:
-            response = self.rekognition.compare_faces(
-                SourceImage={
-                    'S3Object': {
-                        'Bucket': self.bucket_name,
-                        'Name': source_image_key
-                    }
-                },
-                TargetImage={
-                    'S3Object': {
-                        'Bucket': self.bucket_name,
-                        'Name': target_image_key
-                    }
-                },
+            response = await self._call_aws(
+                "rekognition.compare_faces",
+                self.rekognition.compare_faces,
+                SourceImage=self._image_reference(source_image_key, source_image_bytes),
+                TargetImage=self._image_reference(target_image_key, target_image_bytes),
                 SimilarityThreshold=similarity_threshold,
                 QualityFilter='HIGH'  # Ensure high-quality face detection
             )
@@ -228,7 +635,7 @@ class FaceVerificationService:
             elif error_code == 'InvalidS3ObjectException':
                 raise Exception("One or both images not found in S3")
             elif error_code == 'ImageTooLargeException':
-                raise Exception("One or both images exceed the size limit (5MB)")
+                raise Exception("One or both images exceed Rekognition's image size limit")
             elif error_code == 'InvalidImageFormatException':
                 raise Exception("One or both images are in an invalid format (must be JPG or PNG)")
             else:
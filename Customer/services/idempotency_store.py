@@ -0,0 +1,206 @@
+import asyncio
+import copy
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from Library.config import settings
+from Library.metrics import metrics
+
+ResponseFactory = Callable[[], Awaitable[Dict]]
+
+# Delete the key only while it still holds this worker's claim, so a leader
+# whose claim expired cannot drop the claim of the worker that took over
+RELEASE_CLAIM_SCRIPT = """
+local raw = redis.call("GET", KEYS[1])
+if raw and cjson.decode(raw)["owner"] == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class IdempotencyConflictError(Exception):
+    """The idempotency key was already used for a different request"""
+
+
+class IdempotencyInProgressError(Exception):
+    """The original request is still running and did not finish in time"""
+
+
+class IdempotencyStore(ABC):
+    """
+    Remembers responses by Idempotency-Key so client retries do not repeat work.
+
+    run() executes the request once per key (single-flight): concurrent
+    duplicates wait for the in-flight request, later duplicates get the stored
+    response. A key is bound to a request fingerprint; reusing it for a
+    different request raises IdempotencyConflictError. Failed requests are
+    not remembered, so the client can retry them.
+    """
+    @abstractmethod
+    async def run(self, key: str, fingerprint: str, fn: ResponseFactory) -> Dict:
+        """
+        Return the response for key, calling fn only if no request with this key ran yet
+
+        Raises:
+            IdempotencyConflictError: If key was used with a different fingerprint
+            IdempotencyInProgressError: If the original request did not finish in time
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """
+    Per-process single-flight store (single worker deployments)
+    """
+    def __init__(self, ttl_seconds: int = 3600, max_entries: int = 10000, wait_timeout_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.wait_timeout_seconds = wait_timeout_seconds
+        # key -> (expires_at, fingerprint, future resolving to the response or None on failure)
+        self._entries: "OrderedDict[str, Tuple[float, str, asyncio.Future]]" = OrderedDict()
+
+    def _live(self, key: str) -> Optional[Tuple[float, str, asyncio.Future]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[2].done() and time.monotonic() > entry[0]:
+            del self._entries[key]
+            return None
+        return entry
+
+    async def run(self, key: str, fingerprint: str, fn: ResponseFactory) -> Dict:
+        deadline = time.monotonic() + self.wait_timeout_seconds
+        while True:
+            entry = self._live(key)
+            if entry is None:
+                break
+            _, stored_fingerprint, future = entry
+            if stored_fingerprint != fingerprint:
+                metrics.incr("idempotency.conflicts")
+                raise IdempotencyConflictError("Idempotency-Key was already used for a different request")
+
+            metrics.incr("idempotency.replayed" if future.done() else "idempotency.joined")
+            try:
+                response = await asyncio.wait_for(
+                    asyncio.shield(future), max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                raise IdempotencyInProgressError("The original request with this Idempotency-Key is still running")
+            if response is not None:
+                return copy.deepcopy(response)
+            # The original request failed; take over as the new leader
+
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, fingerprint, future)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        try:
+            response = await fn()
+        except BaseException:
+            self._entries.pop(key, None)
+            future.set_result(None)
+            raise
+
+        future.set_result(copy.deepcopy(response))
+        return response
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """
+    Single-flight across workers: the first request claims the key with
+    SET NX, duplicates poll until the response is stored or the claim goes away.
+    Each claim carries an owner token and is only released by its owner.
+    """
+    def __init__(
+        self,
+        redis_url: str,
+        ttl_seconds: int = 3600,
+        lock_seconds: float = 120.0,
+        wait_timeout_seconds: float = 60.0,
+        poll_interval_seconds: float = 0.25,
+        prefix: str = "idempotency:"
+    ):
+        from redis import asyncio as aioredis
+
+        self.client = aioredis.from_url(redis_url)
+        self.release_claim = self.client.register_script(RELEASE_CLAIM_SCRIPT)
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.prefix = prefix
+
+    async def run(self, key: str, fingerprint: str, fn: ResponseFactory) -> Dict:
+        redis_key = self.prefix + key
+        deadline = time.monotonic() + self.wait_timeout_seconds
+        joined = False
+        owner = uuid.uuid4().hex
+        while True:
+            claim = json.dumps({"state": "in_progress", "fingerprint": fingerprint, "owner": owner})
+            # The claim expires on its own if the worker holding it dies
+            if await self.client.set(redis_key, claim, nx=True, ex=int(self.lock_seconds)):
+                break
+
+            raw = await self.client.get(redis_key)
+            if raw is None:
+                continue
+            entry = json.loads(raw)
+            if entry["fingerprint"] != fingerprint:
+                metrics.incr("idempotency.conflicts")
+                raise IdempotencyConflictError("Idempotency-Key was already used for a different request")
+            if entry["state"] == "completed":
+                metrics.incr("idempotency.replayed")
+                return entry["response"]
+
+            if not joined:
+                metrics.incr("idempotency.joined")
+                joined = True
+            if time.monotonic() > deadline:
+                raise IdempotencyInProgressError("The original request with this Idempotency-Key is still running")
+            await asyncio.sleep(self.poll_interval_seconds)
+
+        try:
+            response = await fn()
+        except BaseException:
+            await self.release_claim(keys=[redis_key], args=[owner])
+            raise
+
+        await self.client.set(
+            redis_key,
+            json.dumps({"state": "completed", "fingerprint": fingerprint, "response": response}),
+            ex=self.ttl_seconds
+        )
+        return response
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_idempotency_store() -> IdempotencyStore:
+    """
+    Build the idempotency store; it follows settings.session_store_backend so
+    both are shared (Redis) or both are per process (memory)
+    """
+    backend = settings.session_store_backend.lower()
+    if backend == "redis":
+        if not settings.redis_url:
+            raise ValueError("SESSION_STORE_BACKEND=redis requires REDIS_URL")
+        return RedisIdempotencyStore(
+            settings.redis_url,
+            ttl_seconds=settings.idempotency_ttl_seconds,
+            wait_timeout_seconds=settings.idempotency_wait_timeout_seconds,
+            # Long enough for the slowest extraction to finish while holding the claim
+            lock_seconds=settings.ocr_request_deadline_seconds * 2
+        )
+    if backend == "memory":
+        return InMemoryIdempotencyStore(
+            settings.idempotency_ttl_seconds,
+            wait_timeout_seconds=settings.idempotency_wait_timeout_seconds
+        )
+    raise ValueError(f"Unknown session store backend '{settings.session_store_backend}'")
@@ -0,0 +1,260 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from Library.config import settings
+from Library.image_processing import preprocess_document_image_async
+from Library.metrics import metrics
+from Library.utils import MultiDocumentExtractionResult, MultiDocumentProcessor, encode_image_to_base64_async
+from Customer.services.face_verification_service import FaceVerificationService
+from Customer.services.verification_service import VerificationService
+from Customer.services.session_store import SessionStore
+
+
+class OCRJob(BaseModel):
+    """
+    Document extraction job; documents are already stored in S3 when the job
+    is enqueued, and the worker fetches and pre-processes them itself so
+    queued messages stay small
+    """
+    job_id: str
+    session_id: str
+    document_keys: List[str] = Field(description="S3 keys of the stored documents, in document_types order")
+    document_types: List[str]
+    id_key: str
+    birth_key: Optional[str] = None
+    combined: Optional[bool] = None
+    profile: Optional[str] = None
+    enqueued_at: float = Field(default_factory=time.time)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+
+JobHandler = Callable[[OCRJob], Awaitable[None]]
+
+
+class InMemoryJobQueue:
+    """
+    In-process queue, the local stand-in for RabbitMQ. Jobs are consumed by
+    worker tasks running in the same process.
+    """
+    def __init__(self, max_size: int = 1000):
+        self._queue: "asyncio.Queue[OCRJob]" = asyncio.Queue(max_size)
+        self._workers: List[asyncio.Task] = []
+
+    async def connect(self) -> None:
+        pass
+
+    async def publish(self, job: OCRJob) -> None:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("OCR job queue is full")
+        metrics.set_gauge("ocr_jobs.queue_depth", self._queue.qsize())
+
+    async def consume(self, handler: JobHandler, concurrency: int) -> None:
+        async def _worker(index: int) -> None:
+            while True:
+                job = await self._queue.get()
+                metrics.set_gauge("ocr_jobs.queue_depth", self._queue.qsize())
+                try:
+                    await handler(job)
+                except Exception as e:
+                    logger.error(f"OCR worker {index} failed job {job.job_id}: {str(e)}")
+                finally:
+                    self._queue.task_done()
+
+        self._workers = [asyncio.create_task(_worker(index)) for index in range(concurrency)]
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+class RabbitMQJobQueue:
+    """
+    Durable RabbitMQ queue so OCR workers can run and scale in separate processes
+    """
+    def __init__(self, url: str, queue_name: str):
+        self.url = url
+        self.queue_name = queue_name
+        self._connection = None
+        self._channel = None
+        self._queue = None
+
+    async def connect(self) -> None:
+        import aio_pika
+
+        self._connection = await aio_pika.connect_robust(self.url)
+        self._channel = await self._connection.channel()
+        self._queue = await self._channel.declare_queue(self.queue_name, durable=True)
+        logger.info(f"Connected to RabbitMQ queue '{self.queue_name}'")
+
+    async def publish(self, job: OCRJob) -> None:
+        import aio_pika
+
+        await self._channel.default_exchange.publish(
+            aio_pika.Message(
+                body=job.model_dump_json().encode("utf-8"),
+                content_type="application/json",
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                message_id=job.job_id
+            ),
+            routing_key=self.queue_name
+        )
+
+    async def consume(self, handler: JobHandler, concurrency: int) -> None:
+        # prefetch bounds how many jobs this process works on at once
+        await self._channel.set_qos(prefetch_count=concurrency)
+
+        async def _on_message(message) -> None:
+            async with message.process(requeue=False):
+                await handler(OCRJob.model_validate_json(message.body))
+
+        await self._queue.consume(_on_message)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+
+
+def create_job_queue():
+    """
+    Build the job queue configured by settings.ocr_job_queue_backend
+    """
+    backend = settings.ocr_job_queue_backend.lower()
+    if backend == "rabbitmq":
+        return RabbitMQJobQueue(settings.rabbitmq_url, settings.ocr_job_queue_name)
+    if backend == "memory":
+        return InMemoryJobQueue(settings.ocr_job_queue_max_size)
+    raise ValueError(f"Unknown OCR job queue backend '{settings.ocr_job_queue_backend}'")
+
+
+class OCRJobService:
+    """
+    Runs document extraction outside the HTTP request.
+
+    The API enqueues an OCRJob and returns immediately; a bounded pool of
+    workers fetches the documents from S3, runs MultiDocumentProcessor and
+    writes the outcome into the registration session.
+    """
+    def __init__(
+        self,
+        processor: MultiDocumentProcessor,
+        verification_service: VerificationService,
+        face_service: FaceVerificationService,
+        sessions: SessionStore,
+        queue=None,
+        workers: Optional[int] = None
+    ):
+        self.processor = processor
+        self.verification_service = verification_service
+        self.face_service = face_service
+        self.sessions = sessions
+        self.queue = queue or create_job_queue()
+        self.workers = settings.ocr_job_workers if workers is None else workers
+        self._started = False
+
+    async def start(self, consume: bool = True) -> None:
+        """
+        Connect to the queue and, unless consume is False, start the workers
+
+        Args:
+            consume (bool): False for processes that only enqueue jobs
+        """
+        if self._started:
+            return
+        await self.queue.connect()
+        if consume and self.workers > 0:
+            await self.queue.consume(self._handle, self.workers)
+            logger.info(f"Started {self.workers} OCR job worker(s)")
+        self._started = True
+
+    async def stop(self) -> None:
+        if self._started:
+            await self.queue.close()
+            self._started = False
+            logger.info("Stopped OCR job service")
+
+    async def submit(self, job: OCRJob) -> None:
+        """
+        Enqueue a job
+
+        Raises:
+            QueueFullError: If the queue cannot accept more jobs
+        """
+        await self.queue.publish(job)
+        metrics.incr("ocr_jobs.submitted")
+        logger.info(f"Enqueued OCR job {job.job_id} for session {job.session_id}")
+
+    async def _extract(self, job: OCRJob) -> Tuple[MultiDocumentExtractionResult, Optional[str]]:
+        """
+        Fetch and pre-process the job's documents, then extract them while the ID face is cropped
+
+        Returns:
+            Tuple[MultiDocumentExtractionResult, Optional[str]]: (extraction, base64 ID face crop)
+        """
+        contents = await asyncio.gather(*(self.face_service.download_from_s3(key) for key in job.document_keys))
+        prepared = await asyncio.gather(*(preprocess_document_image_async(content) for content in contents))
+        images = await asyncio.gather(*(encode_image_to_base64_async(image.data) for image in prepared))
+        return await asyncio.gather(
+            self.processor.extract_documents(
+                images=list(images),
+                document_types=job.document_types,
+                combined=job.combined,
+                profile=job.profile,
+                image_hashes=[image.phash for image in prepared],
+                session_id=job.session_id
+            ),
+            self.face_service.crop_document_face_base64(prepared[0].data)
+        )
+
+    async def _handle(self, job: OCRJob) -> None:
+        metrics.observe("ocr_jobs.queue_wait", time.time() - job.enqueued_at)
+        claimed = await self.sessions.transition(
+            job.session_id, "documents_queued", {"status": "documents_processing"}
+        )
+        if not claimed:
+            logger.warning(
+                f"Dropping OCR job {job.job_id}: session {job.session_id} no longer exists or was already processed"
+            )
+            return
+
+        started = time.perf_counter()
+        try:
+            extraction, id_face_crop = await self._extract(job)
+            await self.sessions.transition(
+                job.session_id,
+                "documents_processing",
+                self.verification_service.build_document_session(
+                    extraction, job.id_key, job.birth_key, id_face_crop
+                )
+            )
+            metrics.incr("ocr_jobs.completed")
+            logger.success(f"OCR job {job.job_id} completed for session {job.session_id}")
+        except Exception as e:
+            await self.sessions.transition(
+                job.session_id, "documents_processing", {"status": "extraction_failed", "error": str(e)}
+            )
+            metrics.incr("ocr_jobs.failed")
+            logger.error(f"OCR job {job.job_id} failed: {str(e)}")
+        except BaseException:
+            # Cancelled by a worker shutdown: the job is not redelivered, so do not
+            # leave the session stuck in documents_processing
+            await self.sessions.transition(
+                job.session_id,
+                "documents_processing",
+                {"status": "extraction_failed", "error": "Extraction was interrupted, please resubmit the documents"}
+            )
+            metrics.incr("ocr_jobs.interrupted")
+            logger.warning(f"OCR job {job.job_id} was interrupted")
+            raise
+        finally:
+            metrics.observe("ocr_jobs.processing_time", time.perf_counter() - started)
@@ -0,0 +1,247 @@
+import asyncio
+import copy
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from Library.config import settings
+from Library.metrics import metrics
+
+
+class SessionStore(ABC):
+    """
+    Registration session storage shared by the API routes and the OCR job workers.
+
+    Sessions are plain JSON-serialisable dicts with a "status" field. Callers
+    get copies, so changes must be written back with update() or transition();
+    transition() is the only safe way to move a session between statuses when
+    several workers may handle the same session.
+    """
+    @abstractmethod
+    async def create(self, session_id: str, data: Dict) -> None:
+        """Store a new session"""
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Dict]:
+        """A copy of the session, or None if it does not exist (or expired)"""
+
+    async def update(self, session_id: str, fields: Dict) -> bool:
+        """
+        Merge fields into a session
+
+        Returns:
+            bool: False if the session does not exist (or expired)
+        """
+        return await self.transition(session_id, None, fields)
+
+    @abstractmethod
+    async def transition(self, session_id: str, expected_status: Optional[str], fields: Dict) -> bool:
+        """
+        Atomically merge fields into a session if it is still in expected_status
+
+        Args:
+            session_id (str): Session to change
+            expected_status (Optional[str]): Required current status, None to skip the check
+            fields (Dict): Fields to merge, usually including the new "status"
+
+        Returns:
+            bool: False if the session is missing or its status has changed
+        """
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """Remove a session if it exists"""
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Bounded per-process store. Sessions expire after ttl_seconds; above
+    max_sessions the least recently used session is evicted; a background
+    sweeper drops expired sessions that are never read again.
+
+    Only correct with a single worker process; use the Redis backend when
+    running several workers or replicas.
+    """
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        max_sessions: int = 10000,
+        sweep_interval_seconds: float = 60.0
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.sweep_interval_seconds = sweep_interval_seconds
+        # session_id -> (expires_at, approximate size in bytes, session)
+        self._sessions: "OrderedDict[str, Tuple[float, int, Dict]]" = OrderedDict()
+        self._bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _publish(self) -> None:
+        metrics.set_gauge("sessions.live", len(self._sessions))
+        metrics.set_gauge("sessions.bytes", self._bytes)
+
+    def _store(self, session_id: str, expires_at: float, session: Dict) -> None:
+        self._remove(session_id)
+        size = len(json.dumps(session, default=str))
+        self._sessions[session_id] = (expires_at, size, session)
+        self._bytes += size
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._remove(oldest)
+            metrics.incr("sessions.evicted")
+            logger.warning(f"Session store full, evicted least recently used session {oldest}")
+        self._publish()
+
+    def _remove(self, session_id: str) -> None:
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _live(self, session_id: str) -> Optional[Tuple[float, Dict]]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, _, session = entry
+        if time.monotonic() > expires_at:
+            self._remove(session_id)
+            metrics.incr("sessions.expired")
+            self._publish()
+            return None
+        self._sessions.move_to_end(session_id)
+        return expires_at, session
+
+    def sweep(self) -> int:
+        """
+        Drop every expired session
+
+        Returns:
+            int: Number of sessions removed
+        """
+        now = time.monotonic()
+        expired = [session_id for session_id, entry in self._sessions.items() if entry[0] < now]
+        for session_id in expired:
+            self._remove(session_id)
+        if expired:
+            metrics.incr("sessions.expired", len(expired))
+            logger.info(f"Session sweeper removed {len(expired)} expired session(s)")
+        self._publish()
+        return len(expired)
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            self.sweep()
+
+    async def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def create(self, session_id: str, data: Dict) -> None:
+        self._store(session_id, time.monotonic() + self.ttl_seconds, copy.deepcopy(data))
+
+    async def get(self, session_id: str) -> Optional[Dict]:
+        entry = self._live(session_id)
+        return copy.deepcopy(entry[1]) if entry is not None else None
+
+    async def transition(self, session_id: str, expected_status: Optional[str], fields: Dict) -> bool:
+        # No await between the check and the write, so this is atomic on the event loop
+        entry = self._live(session_id)
+        if entry is None:
+            return False
+        expires_at, session = entry
+        if expected_status is not None and session.get("status") != expected_status:
+            return False
+        # Re-store so the size accounting follows the update; the TTL is kept
+        self._store(session_id, expires_at, {**session, **copy.deepcopy(fields)})
+        return True
+
+    async def delete(self, session_id: str) -> None:
+        self._remove(session_id)
+        self._publish()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Redis-backed store shared by every worker and replica. Sessions are JSON
+    strings with a key TTL; transitions use WATCH/MULTI so concurrent
+    requests for the same session cannot both win.
+    """
+    def __init__(self, redis_url: str, ttl_seconds: int = 3600, prefix: str = "registration-session:"):
+        from redis import asyncio as aioredis
+
+        self.client = aioredis.from_url(redis_url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def create(self, session_id: str, data: Dict) -> None:
+        await self.client.set(self.prefix + session_id, json.dumps(data), ex=self.ttl_seconds)
+
+    async def get(self, session_id: str) -> Optional[Dict]:
+        raw = await self.client.get(self.prefix + session_id)
+        return json.loads(raw) if raw else None
+
+    async def transition(self, session_id: str, expected_status: Optional[str], fields: Dict) -> bool:
+        from redis.exceptions import WatchError
+
+        key = self.prefix + session_id
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    if not raw:
+                        return False
+                    session = json.loads(raw)
+                    if expected_status is not None and session.get("status") != expected_status:
+                        return False
+                    session.update(fields)
+
+                    pipe.multi()
+                    pipe.set(key, json.dumps(session), keepttl=True)
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    # Another worker changed the session first; re-read and re-check
+                    metrics.incr("sessions.transition_conflicts")
+                    continue
+
+    async def delete(self, session_id: str) -> None:
+        await self.client.delete(self.prefix + session_id)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_session_store() -> SessionStore:
+    """
+    Build the session store configured by settings.session_store_backend
+    """
+    backend = settings.session_store_backend.lower()
+    if backend == "redis":
+        if not settings.redis_url:
+            raise ValueError("SESSION_STORE_BACKEND=redis requires REDIS_URL")
+        logger.info("Using Redis registration session store")
+        return RedisSessionStore(settings.redis_url, settings.session_ttl_seconds)
+    if backend == "memory":
+        return InMemorySessionStore(
+            ttl_seconds=settings.session_ttl_seconds,
+            max_sessions=settings.session_store_max_sessions,
+            sweep_interval_seconds=settings.session_sweep_interval_seconds
+        )
+    raise ValueError(f"Unknown session store backend '{settings.session_store_backend}'")
@@ -1,4 +1,6 @@
 from typing import Optional, Dict, List
+import asyncio
+import base64
 import os
 import io
 import uuid
@@ -8,8 +10,10 @@ from fastapi import HTTPException
 from pydantic import BaseModel
 from loguru import logger
 
-from Library.utils import DocumentOCRProcessor, DocumentExtractionResult
-from Customer.services.face_verification_service import FaceVerificationService
+from Library.config import settings
+from Library.resilience import ServiceUnavailableError
+from Library.utils import DocumentOCRProcessor, DocumentExtractionResult, MultiDocumentExtractionResult
+from Customer.services.face_verification_service import FaceVerificationService, REKOGNITION_MAX_IMAGE_BYTES
 from Customer.dto.requests.customer_request import CustomerCreateRequest
 from persistence.db.models.customer import Customer
 
@@ -24,13 +28,61 @@ class BiometricVerificationResult(BaseModel):
     success: bool
     message: str
 
+# Extracted fields not kept in registration sessions (the full transcription is
+# large and nothing after extraction reads it)
+SESSION_EXCLUDED_FIELDS = {"raw_text"}
+
+
+def _session_document_info(document_info) -> Dict:
+    return document_info.dict(exclude=SESSION_EXCLUDED_FIELDS) if document_info else {}
+
+
 class VerificationService:
-    def __init__(self):
+    def __init__(
+        self,
+        ocr_processor: Optional[DocumentOCRProcessor] = None,
+        face_service: Optional[FaceVerificationService] = None
+    ):
         logger.info("Initializing VerificationService")
-        self.ocr_processor = DocumentOCRProcessor()
-        self.face_service = FaceVerificationService()
+        self.ocr_processor = ocr_processor or DocumentOCRProcessor()
+        self.face_service = face_service or FaceVerificationService()
         logger.info("VerificationService initialized successfully")
         
+    def build_document_session(
+        self,
+        extraction: MultiDocumentExtractionResult,
+        id_key: str,
+        birth_key: Optional[str] = None,
+        id_face_crop: Optional[str] = None
+    ) -> Dict:
+        """
+        Registration session fields produced by a completed document extraction
+
+        Args:
+            extraction: Result of MultiDocumentProcessor.extract_documents
+            id_key: S3 key of the ID card (used later for face comparison)
+            birth_key: S3 key of the birth certificate, if one was uploaded
+            id_face_crop: Base64 JPEG of the ID face, used as the comparison source when present
+        """
+        results = extraction.results
+        session = {
+            "id_card_info": _session_document_info(results[0].document_info),
+            "id_photo_path": id_key,  # S3 key for face comparison
+            "document_consistency": extraction.consistency,
+            "status": "documents_verified"
+        }
+        if id_face_crop:
+            session["id_face_crop"] = id_face_crop
+        if any(extraction.near_duplicates):
+            # Kept for review; not returned to the client
+            session["near_duplicates"] = extraction.near_duplicates
+
+        # Add birth certificate info if provided
+        if birth_key and len(results) > 1:
+            session["birth_cert_info"] = _session_document_info(results[1].document_info)
+            session["birth_cert_path"] = birth_key
+        return session
+
     async def verify_document(self, document_image: bytes) -> VerificationResult:
         """
         Process and verify uploaded ID document
@@ -80,41 +132,118 @@ class VerificationService:
                 message=error_msg
             )
     
+    def _face_mismatch(self, similarity: float, quality: Dict) -> VerificationResult:
+        """Result for a selfie that does not match the ID photo"""
+        logger.warning(f"Face comparison failed with similarity score: {similarity}")
+        return VerificationResult(
+            success=False,
+            stage="biometric_verification",
+            message="Face comparison failed - faces don't match",
+            details={"similarity_score": similarity, **quality}
+        )
+
+    def _quality_failure(self, quality: Dict, similarity: Optional[float] = None) -> VerificationResult:
+        """Biometric verification result for a selfie that failed a quality check"""
+        suggestions = quality.get("suggestions", [])
+        logger.warning(f"Selfie failed quality checks: {quality.get('error') or suggestions}")
+        details = dict(quality)
+        if similarity is not None:
+            details["similarity_score"] = similarity
+        return VerificationResult(
+            success=False,
+            stage="biometric_verification",
+            message=" ".join([quality.get("error") or "Selfie failed quality checks.", *suggestions]),
+            details=details
+        )
+
     async def verify_biometrics(
         self,
-        selfie_image: bytes,
-        id_photo_path: str
+        selfie_image: Optional[bytes],
+        id_photo_path: str,
+        id_face_crop: Optional[str] = None,
+        selfie_key: Optional[str] = None
     ) -> VerificationResult:
         """
         Verify user's biometric information
-        - Compares selfie with ID photo
+        - Rejects unusable selfies locally
+        - Runs Rekognition quality detection, face comparison and S3 archival
+          concurrently, cancelling the rest as soon as one fails decisively
+
+        A selfie the client already uploaded to S3 (selfie_key, selfie_image None)
+        is never downloaded: Rekognition reads it from S3 directly, so the local
+        prescreen and the archival upload are skipped.
         """
         logger.info("Starting biometric verification process")
-        try:
-            # Generate unique ID for selfie storage
+        source = {"source_image_key": id_photo_path}
+        if id_face_crop:
+            # Small pre-cropped ID face instead of the full document in S3
+            source = {"source_image_bytes": base64.b64decode(id_face_crop)}
+
+        if selfie_image is None and selfie_key is None:
+            raise ValueError("Either selfie_image or selfie_key is required")
+        archived = selfie_image is None
+
+        # Generate unique ID for selfie storage
+        s3_key = selfie_key
+        if s3_key is None:
             selfie_id = str(uuid.uuid4())
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Store selfie in S3
             s3_key = f"selfies/{selfie_id}_{timestamp}.jpg"
-            logger.info(f"Storing selfie in S3 with key: {s3_key}")
-            s3_path = await self.face_service.upload_to_s3(selfie_image, s3_key)
-            
-            # Compare faces
-            logger.info("Comparing faces")
-            match_found, similarity = await self.face_service.compare_faces(
-                source_image_key=id_photo_path,
-                target_image_key=s3_key
-            )
-            
-            if not match_found:
-                logger.warning(f"Face comparison failed with similarity score: {similarity}")
-                return VerificationResult(
-                    success=False,
-                    stage="biometric_verification",
-                    message="Face comparison failed - faces don't match",
-                    details={"similarity_score": similarity}
-                )
+        # Selfies over Rekognition's inline limit are read back from S3 once archived
+        inline = not archived and len(selfie_image) <= REKOGNITION_MAX_IMAGE_BYTES
+        compare_bytes = inline and settings.face_compare_selfie_bytes
+
+        tasks: Dict[str, asyncio.Future] = {}
+        try:
+            # Cheap local gate first so bad selfies never reach AWS
+            if settings.selfie_prescreen_enabled and not archived:
+                is_valid, quality = await self.face_service.prescreen_selfie(selfie_image)
+                if not is_valid:
+                    return self._quality_failure(quality)
+
+            if archived:
+                logger.info(f"Checking quality and comparing faces against uploaded selfie: {s3_key}")
+            else:
+                logger.info(f"Checking quality, comparing faces and storing selfie in S3 with key: {s3_key}")
+                tasks["upload"] = asyncio.ensure_future(self.face_service.upload_to_s3(selfie_image, s3_key))
+
+            async def _compare():
+                if compare_bytes:
+                    # Compare against the in-memory selfie while it is archived
+                    return await self.face_service.compare_faces(target_image_bytes=selfie_image, **source)
+                # Too large to send inline: Rekognition reads the archived selfie from S3
+                if "upload" in tasks:
+                    await asyncio.shield(tasks["upload"])
+                return await self.face_service.compare_faces(target_image_key=s3_key, **source)
+
+            async def _quality():
+                if inline:
+                    return await self.face_service.verify_face_quality(image_bytes=selfie_image)
+                if "upload" in tasks:
+                    await asyncio.shield(tasks["upload"])
+                return await self.face_service.verify_face_quality(image_key=s3_key)
+
+            tasks["compare"] = asyncio.ensure_future(_compare())
+            if settings.face_quality_check_enabled:
+                tasks["quality"] = asyncio.ensure_future(_quality())
+
+            compare_task, quality_task = tasks["compare"], tasks.get("quality")
+            pending = set(tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # Re-raises AWS failures; the finally block cancels the rest
+                    task.result()
+                if quality_task in done and not quality_task.result()[0]:
+                    similarity = compare_task.result()[1] if compare_task.done() else None
+                    return self._quality_failure(quality_task.result()[1], similarity)
+                if compare_task in done and not compare_task.result()[0]:
+                    # A mismatch is decisive on its own; the finally block cancels the other checks
+                    quality = quality_task.result()[1] if quality_task is not None and quality_task.done() else {}
+                    return self._face_mismatch(compare_task.result()[1], quality)
+
+            similarity = compare_task.result()[1]
+            quality = quality_task.result()[1] if quality_task is not None else {}
             
             logger.success("Biometric verification completed successfully")
             return VerificationResult(
@@ -123,10 +252,14 @@ class VerificationService:
                 message="Biometric verification successful",
                 details={
                     "selfie_path": s3_key,
-                    "face_match_score": similarity
+                    "face_match_score": similarity,
+                    **quality
                 }
             )
             
+        except ServiceUnavailableError:
+            # Retryable: surfaced to the client as 503 rather than a failed verification
+            raise
         except Exception as e:
             error_msg = f"Biometric verification failed: {str(e)}"
             logger.error(error_msg)
@@ -135,6 +268,14 @@ class VerificationService:
                 stage="biometric_verification",
                 message=error_msg
             )
+        finally:
+            outstanding = [task for task in tasks.values() if not task.done()]
+            for task in outstanding:
+                task.cancel()
+            if outstanding:
+                logger.info(f"Cancelled {len(outstanding)} outstanding biometric call(s)")
+            # Also collects errors of tasks that finished after the first failure
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
     
     async def complete_verification(
         self,
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
+from typing import Optional
 import os
 from loguru import logger
 
@@ -38,11 +39,48 @@ class BaseConfig(BaseSettings):
     database_password: str
     database_name: str
     database_port: str
-    # redis_url: str
+    redis_url: Optional[str] = None
+    session_store_backend: str = "memory"  # "memory" (single worker) or "redis"
+    session_ttl_seconds: int = 3600
+    session_store_max_sessions: int = 10000  # in-memory backend only
+    session_sweep_interval_seconds: float = 60.0
+    idempotency_ttl_seconds: int = 3600
+    idempotency_wait_timeout_seconds: float = 60.0  # how long a resend waits for the original request
     aws_access_key_id: str
     aws_secret_access_key: str
     aws_bucket_name: str
     aws_region: str
+    aws_endpoint_url: Optional[str] = None  # e.g. a local moto server
+    aws_max_pool_connections: int = 32
+    aws_executor_workers: int = 32
+    aws_limiter_initial_limit: int = 16
+    aws_limiter_min_limit: int = 1
+    aws_circuit_failure_threshold: int = 5
+    aws_circuit_recovery_seconds: float = 30.0
+    s3_multipart_threshold_bytes: int = 8 * 1024 * 1024
+    s3_multipart_chunk_bytes: int = 8 * 1024 * 1024
+
+    # Upload ingestion
+    max_upload_bytes: int = 10 * 1024 * 1024
+    upload_chunk_bytes: int = 1024 * 1024
+    upload_spool_dir: Optional[str] = None  # defaults to the system temp directory
+    # Lifetime of the presigned POST policies for direct-to-S3 uploads
+    presigned_upload_expiry_seconds: int = 900
+    # Send the selfie to Rekognition as bytes while it is archived to S3 concurrently
+    face_compare_selfie_bytes: bool = True
+    # Crop the ID face once at extraction and compare selfies against the crop
+    face_crop_enabled: bool = True
+    face_crop_max_dimension: int = 400
+    # Selfie quality gates: local prescreen first, then Rekognition DetectFaces
+    face_quality_check_enabled: bool = True
+    selfie_prescreen_enabled: bool = True
+    selfie_prescreen_min_bytes: int = 10 * 1024
+    # Matches max_upload_bytes; selfies over Rekognition's 5MB inline limit are read from S3
+    selfie_prescreen_max_bytes: int = 10 * 1024 * 1024
+    selfie_prescreen_min_dimension: int = 320
+    selfie_prescreen_min_brightness: float = 40.0
+    selfie_prescreen_max_brightness: float = 220.0
+    selfie_prescreen_min_sharpness: float = 60.0  # Laplacian variance at 640px
     openai_api_key: str
     langchain_tracing_v2: bool
     langchain_api_key: str
@@ -57,6 +95,77 @@ class BaseConfig(BaseSettings):
     # ngrok_url: str
     backend_url: str
 
+    # OCR result cache
+    ocr_cache_enabled: bool = True
+    ocr_cache_max_entries: int = 256
+    ocr_cache_ttl_seconds: int = 86400
+    ocr_cache_persistent_backend: Optional[str] = None  # "disk" or "redis"
+    ocr_cache_disk_path: str = ".cache/ocr"
+
+    # Near-duplicate document detection (perceptual hashes of resubmitted photos)
+    duplicate_index_enabled: bool = True
+    duplicate_index_max_entries: int = 10000
+    duplicate_index_ttl_seconds: int = 86400
+    duplicate_index_max_distance: int = 4  # Hamming distance out of 64 bits
+    duplicate_index_bands: int = 8
+    # Reuse an earlier extraction for byte-identical images or same-session resubmissions;
+    # look-alikes from other sessions are only flagged
+    duplicate_index_reuse_results: bool = False
+    # Flag a document once this many sessions have submitted it
+    duplicate_index_alert_sessions: int = 3
+
+    # OCR models: documents go to the fast model first and are escalated to
+    # ocr_model only when the fast result fails validation
+    ocr_model: str = "claude-3-opus-20240229"
+    ocr_fast_model: Optional[str] = "claude-3-haiku-20240307"
+    ocr_cascade_enabled: bool = True
+
+    # OCR extraction profile: "full" (every field incl. raw_text) or "lean" (identity fields only)
+    ocr_extraction_profile: str = "full"
+    # Send all documents in one Claude request instead of one request per image
+    ocr_combined_extraction: bool = False
+
+    # OCR image pre-processing
+    ocr_image_preprocessing_enabled: bool = True
+    ocr_image_max_dimension: int = 1568
+    ocr_image_jpeg_quality: int = 85
+    ocr_image_crop_enabled: bool = True
+
+    # CPU-bound image work (decode, resize, re-encode, quality checks)
+    image_pool_mode: str = "process"  # "process" or "thread"
+    image_pool_workers: Optional[int] = None  # defaults to the CPU count
+    image_pool_start_method: str = "forkserver"
+    # In-memory images at least this large reach worker processes through shared memory
+    image_pool_shared_memory_min_bytes: int = 256 * 1024
+    event_loop_lag_interval_seconds: float = 0.1  # 0 disables the lag monitor
+
+    # Background OCR jobs
+    ocr_job_queue_backend: str = "memory"  # "memory" or "rabbitmq"
+    ocr_job_queue_name: str = "ocr-jobs"
+    ocr_job_queue_max_size: int = 1000
+    ocr_job_workers: int = 4  # Consumers inside each API process; 0 = only enqueue
+    ocr_worker_concurrency: int = 4  # Jobs each standalone ocr_worker.py process runs at once
+    rabbitmq_url: Optional[str] = None
+
+    # LLM client
+    anthropic_api_url: str = "https://api.anthropic.com"
+    llm_warmup_connections: int = 2
+    llm_prompt_caching_enabled: bool = True
+
+    # LLM retries and hedging
+    ocr_request_deadline_seconds: float = 45.0
+    llm_retry_max_attempts: int = 3
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 8.0
+    llm_hedging_enabled: bool = False
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_min_samples: int = 20
+    llm_hedge_budget_ratio: float = 0.1  # max share of calls that may be hedged
+    llm_max_concurrency: int = 32
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive_connections: int = 20
+    llm_request_timeout_seconds: float = 60.0
+
     class Config:
         env_file = ENV_FILE
         extra = "ignore"
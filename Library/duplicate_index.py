@@ -0,0 +1,263 @@
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from pydantic import BaseModel
+
+from Library.config import settings
+from Library.metrics import metrics
+
+HASH_BITS = 64
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+class DuplicateMatch(BaseModel):
+    """
+    An earlier submission whose perceptual hash is close to the new one
+
+    A close hash only means the photos look alike, not that they show the same
+    document, so `payload` is safe to reuse only when `exact` (identical image
+    bytes) or `same_session` (indexed by the session now looking it up).
+    """
+    distance: int
+    payload: Dict
+    sessions: int
+    flagged: bool
+    exact: bool = False
+    same_session: bool = False
+
+
+class _IndexEntry:
+    __slots__ = ("expires_at", "phash", "digest", "context", "payload", "origin_session", "sessions")
+
+    def __init__(
+        self,
+        expires_at: float,
+        phash: int,
+        digest: Optional[str],
+        context: str,
+        payload: Dict,
+        origin_session: Optional[str]
+    ):
+        self.expires_at = expires_at
+        self.phash = phash
+        self.digest = digest
+        self.context = context
+        self.payload = payload
+        self.origin_session = origin_session
+        self.sessions: Set[str] = set()
+
+
+class PerceptualHashIndex:
+    """
+    Bounded in-memory index of document perceptual hashes and the extraction
+    results they produced, for finding near-duplicate resubmissions.
+
+    Matches from other sessions are reported and counted for review only;
+    their results are never handed to a different applicant unless the image
+    bytes are identical (see DuplicateMatch).
+
+    Lookups are banded: the 64-bit hash is split into `bands` chunks and each
+    chunk value is a bucket. Two hashes at most `bands - 1` bits apart agree
+    exactly on at least one chunk, so only entries sharing a bucket are
+    compared bit by bit instead of scanning the whole index.
+
+    Each entry also counts the distinct sessions that submitted it; a document
+    seen in `alert_sessions` or more sessions is flagged for review.
+    """
+    def __init__(
+        self,
+        max_distance: int = 4,
+        bands: int = 8,
+        max_entries: int = 10000,
+        ttl_seconds: int = 86400,
+        alert_sessions: int = 3
+    ):
+        if HASH_BITS % bands:
+            raise ValueError(f"bands must divide {HASH_BITS}")
+        if max_distance >= bands:
+            logger.warning(
+                f"Duplicate index max_distance={max_distance} with {bands} bands may miss matches; "
+                f"use more bands than max_distance"
+            )
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = HASH_BITS // bands
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.alert_sessions = alert_sessions
+        self._entries: "OrderedDict[int, _IndexEntry]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self._next_id = 0
+
+    def _band_keys(self, phash: int) -> List[Tuple[int, int]]:
+        mask = (1 << self.band_bits) - 1
+        return [(band, (phash >> (band * self.band_bits)) & mask) for band in range(self.bands)]
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry.phash):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _record_session(self, entry: _IndexEntry, session_id: Optional[str]) -> bool:
+        """Count a session against an entry; returns True once it crosses alert_sessions"""
+        if session_id is not None and len(entry.sessions) < self.alert_sessions:
+            entry.sessions.add(session_id)
+            if len(entry.sessions) == self.alert_sessions:
+                metrics.incr("duplicate_index.flagged")
+                logger.warning(
+                    f"Document submitted in {len(entry.sessions)} sessions: {sorted(entry.sessions)}"
+                )
+        return len(entry.sessions) >= self.alert_sessions
+
+    def _closest(self, phash: int, context: str) -> Tuple[Optional[int], int]:
+        """Id and distance of the closest live entry within max_distance, dropping expired ones"""
+        now = time.monotonic()
+        candidates: Set[int] = set()
+        for key in self._band_keys(phash):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_id, best_distance = None, self.max_distance + 1
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if entry.expires_at < now:
+                self._remove(entry_id)
+                continue
+            if entry.context != context:
+                continue
+            distance = hamming_distance(phash, entry.phash)
+            if distance < best_distance:
+                best_id, best_distance = entry_id, distance
+        return best_id, best_distance
+
+    def lookup(
+        self,
+        phash: int,
+        context: str,
+        session_id: Optional[str] = None,
+        digest: Optional[str] = None
+    ) -> Optional[DuplicateMatch]:
+        """
+        Find the closest earlier submission within max_distance
+
+        Args:
+            phash (int): Perceptual hash of the new document
+            context (str): Extraction context (document type, profile, models);
+                only entries with the same context match
+            session_id (Optional[str]): Session submitting the document, counted for reuse flagging
+            digest (Optional[str]): sha256 of the exact image bytes, compared for DuplicateMatch.exact
+
+        Returns:
+            Optional[DuplicateMatch]: Closest match, or None
+        """
+        best_id, best_distance = self._closest(phash, context)
+        if best_id is None:
+            metrics.incr("duplicate_index.misses")
+            return None
+
+        entry = self._entries[best_id]
+        self._entries.move_to_end(best_id)
+        flagged = self._record_session(entry, session_id)
+        same_session = session_id is not None and entry.origin_session == session_id
+        metrics.incr("duplicate_index.hits")
+        if not same_session:
+            metrics.incr("duplicate_index.cross_session_hits")
+        return DuplicateMatch(
+            distance=best_distance,
+            payload=entry.payload,
+            sessions=len(entry.sessions),
+            flagged=flagged,
+            exact=digest is not None and entry.digest == digest,
+            same_session=same_session
+        )
+
+    def add(
+        self,
+        phash: int,
+        context: str,
+        payload: Dict,
+        session_id: Optional[str] = None,
+        digest: Optional[str] = None
+    ) -> None:
+        """
+        Index a submission and its extraction result
+
+        Args:
+            phash (int): Perceptual hash of the document
+            context (str): Extraction context, see lookup()
+            payload (Dict): JSON-serialisable extraction result
+            session_id (Optional[str]): Session that submitted the document
+            digest (Optional[str]): sha256 of the exact image bytes
+        """
+        entry_id = self._next_id
+        self._next_id += 1
+        entry = _IndexEntry(time.monotonic() + self.ttl_seconds, phash, digest, context, payload, session_id)
+        self._record_session(entry, session_id)
+        self._entries[entry_id] = entry
+        for key in self._band_keys(phash):
+            self._buckets.setdefault(key, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            metrics.incr("duplicate_index.evictions")
+        metrics.set_gauge("duplicate_index.entries", len(self._entries))
+
+    def add_or_merge(
+        self,
+        phash: int,
+        context: str,
+        payload: Dict,
+        session_id: Optional[str] = None,
+        digest: Optional[str] = None
+    ) -> None:
+        """
+        Index a freshly extracted submission unless it matches an existing entry
+
+        A match keeps the original entry and its payload: the session is counted
+        against it and its TTL is refreshed, so resubmissions of one document
+        accumulate on a single entry instead of spreading their session counts.
+        Arguments as for add().
+        """
+        entry_id, _ = self._closest(phash, context)
+        if entry_id is None:
+            self.add(phash, context, payload, session_id, digest)
+            return
+        entry = self._entries[entry_id]
+        self._record_session(entry, session_id)
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        self._entries.move_to_end(entry_id)
+        metrics.incr("duplicate_index.merged")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def create_duplicate_index() -> Optional[PerceptualHashIndex]:
+    """
+    Build the near-duplicate document index from settings, None when disabled
+    """
+    if not settings.duplicate_index_enabled:
+        return None
+    logger.info(
+        f"Near-duplicate document index: max_entries={settings.duplicate_index_max_entries}, "
+        f"max_distance={settings.duplicate_index_max_distance}, bands={settings.duplicate_index_bands}, "
+        f"reuse_results={settings.duplicate_index_reuse_results}"
+    )
+    return PerceptualHashIndex(
+        max_distance=settings.duplicate_index_max_distance,
+        bands=settings.duplicate_index_bands,
+        max_entries=settings.duplicate_index_max_entries,
+        ttl_seconds=settings.duplicate_index_ttl_seconds,
+        alert_sessions=settings.duplicate_index_alert_sessions
+    )
@@ -0,0 +1,109 @@
+from typing import Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, Field, create_model
+
+from Library.config import settings
+
+
+class ExtractionProfile(BaseModel):
+    """
+    Selects which DocumentInfo fields the model is asked to produce
+    """
+    name: str
+    fields: Optional[Tuple[str, ...]] = Field(default=None, description="Fields to extract, None for all")
+    required: Tuple[str, ...] = Field(default=(), description="Fields the model must always return")
+    instructions: str = Field(description="Profile specific guidance appended to the OCR prompt")
+
+
+EXTRACTION_PROFILES: Dict[str, ExtractionProfile] = {
+    "full": ExtractionProfile(
+        name="full",
+        fields=None,
+        required=(
+            "full_name", "date_of_birth", "document_type", "identification_number",
+            "raw_text", "id_card_issue_date", "id_card_expiry_date", "where_born",
+        ),
+        instructions="Make sure to extract all visible text fields accurately.",
+    ),
+    "lean": ExtractionProfile(
+        name="lean",
+        fields=(
+            "full_name", "date_of_birth", "document_type", "identification_number",
+            "nationality", "gender", "id_card_issue_date", "id_card_expiry_date",
+            "where_born", "birth_certificate_margin_number",
+        ),
+        required=("full_name", "date_of_birth", "document_type", "identification_number"),
+        instructions=(
+            "Only extract the identity fields requested by the function. "
+            "Do NOT transcribe the rest of the document."
+        ),
+    ),
+}
+
+_schema_cache: Dict[Tuple[str, str, bool], Type[BaseModel]] = {}
+
+
+def get_extraction_profile(name: Optional[str] = None) -> ExtractionProfile:
+    """
+    Look up a profile by name, defaulting to settings.ocr_extraction_profile
+
+    Raises:
+        ValueError: If the profile does not exist
+    """
+    name = (name or settings.ocr_extraction_profile).lower()
+    if name not in EXTRACTION_PROFILES:
+        raise ValueError(
+            f"Unknown extraction profile '{name}', expected one of {sorted(EXTRACTION_PROFILES)}"
+        )
+    return EXTRACTION_PROFILES[name]
+
+
+def build_profile_schema(
+    base: Type[BaseModel],
+    profile: ExtractionProfile,
+    multi: bool = False
+) -> Type[BaseModel]:
+    """
+    Generate the structured-output schema sent to the model for a profile
+
+    Args:
+        base (Type[BaseModel]): Model holding every extractable field (DocumentInfo)
+        profile (ExtractionProfile): Profile selecting fields and required fields
+        multi (bool): Wrap the schema in a list of documents for combined extraction
+
+    Returns:
+        Type[BaseModel]: Generated pydantic model
+    """
+    key = (base.__name__, profile.name, multi)
+    if key in _schema_cache:
+        return _schema_cache[key]
+
+    definitions = {}
+    for name, field in base.model_fields.items():
+        if profile.fields is not None and name not in profile.fields:
+            continue
+        if name in profile.required:
+            definitions[name] = (str, Field(description=field.description))
+        else:
+            definitions[name] = (Optional[str], Field(default=None, description=field.description))
+
+    schema = create_model(
+        base.__name__,
+        __config__=ConfigDict(extra='forbid'),
+        # The docstring becomes the tool description; keep only its summary line
+        __doc__=(base.__doc__ or "").strip().split("\n\n")[0],
+        **definitions
+    )
+    if multi:
+        schema = create_model(
+            f"Multi{base.__name__}",
+            __config__=ConfigDict(extra='forbid'),
+            __doc__="Structured model for extracting several documents in a single call",
+            documents=(
+                List[schema],
+                Field(description="Extracted information for each image, in the order the images were given")
+            )
+        )
+
+    _schema_cache[key] = schema
+    return schema
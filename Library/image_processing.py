@@ -0,0 +1,255 @@
+import asyncio
+import io
+import os
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+from loguru import logger
+from PIL import Image, ImageChops, ImageOps, UnidentifiedImageError
+from pydantic import BaseModel
+
+from Library.config import settings
+from Library.metrics import metrics
+from Library.utils import run_image_task
+
+# Fraction of the frame a detected document must cover before we trust the crop
+MIN_CROP_AREA_RATIO = 0.2
+CROP_MARGIN_RATIO = 0.02
+BACKGROUND_THRESHOLD = 40
+EXIF_ORIENTATION = 0x0112
+
+
+class PreprocessedImage(BaseModel):
+    """
+    Image ready to be sent for OCR
+    """
+    data: bytes
+    media_type: str = "image/jpeg"
+    width: int = 0
+    height: int = 0
+    original_bytes: int
+    processed_bytes: int
+    cropped: bool = False
+    phash: Optional[int] = None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+
+def _find_document_box(image: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Locate the document inside a photo by separating it from the border colour
+
+    Args:
+        image: RGB image
+
+    Returns:
+        Optional bounding box (left, upper, right, lower) in image coordinates
+    """
+    gray = ImageOps.grayscale(image)
+    probe = gray.copy()
+    probe.thumbnail((256, 256))
+
+    width, height = probe.size
+    border = [
+        probe.getpixel((x, y))
+        for x in (0, width - 1)
+        for y in (0, height // 2, height - 1)
+    ] + [probe.getpixel((width // 2, 0)), probe.getpixel((width // 2, height - 1))]
+    background = sorted(border)[len(border) // 2]
+
+    diff = ImageChops.difference(probe, Image.new("L", probe.size, background))
+    mask = diff.point(lambda value: 255 if value > BACKGROUND_THRESHOLD else 0)
+    box = mask.getbbox()
+    if box is None:
+        return None
+
+    left, upper, right, lower = box
+    if (right - left) * (lower - upper) < MIN_CROP_AREA_RATIO * width * height:
+        return None
+
+    scale_x = image.width / width
+    scale_y = image.height / height
+    margin_x = int(image.width * CROP_MARGIN_RATIO)
+    margin_y = int(image.height * CROP_MARGIN_RATIO)
+    return (
+        max(0, int(left * scale_x) - margin_x),
+        max(0, int(upper * scale_y) - margin_y),
+        min(image.width, int(right * scale_x) + margin_x),
+        min(image.height, int(lower * scale_y) + margin_y),
+    )
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    basis = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    basis[0] /= np.sqrt(2)
+    return basis
+
+
+PHASH_SAMPLE_SIZE = 32
+PHASH_BITS_SIDE = 8
+_PHASH_DCT = _dct_matrix(PHASH_SAMPLE_SIZE)
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64-bit pHash: the signs of the lowest 8x8 DCT frequencies of a 32x32
+    grayscale thumbnail, relative to their median. Re-encoding, rescaling and
+    lighting changes move only a few bits, so near-identical photos are a
+    small Hamming distance apart.
+
+    Args:
+        image (Image.Image): Decoded image
+
+    Returns:
+        int: Hash as an unsigned 64-bit integer
+    """
+    gray = image.convert("L").resize((PHASH_SAMPLE_SIZE, PHASH_SAMPLE_SIZE), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (_PHASH_DCT @ pixels @ _PHASH_DCT.T)[:PHASH_BITS_SIDE, :PHASH_BITS_SIDE].flatten()
+    # The DC term is the average brightness; leave it out of the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def _unprocessed(image_bytes: Union[bytes, str]) -> PreprocessedImage:
+    """The original image, unchanged"""
+    if isinstance(image_bytes, str):
+        with open(image_bytes, "rb") as fh:
+            image_bytes = fh.read()
+    return PreprocessedImage(
+        data=image_bytes,
+        original_bytes=len(image_bytes),
+        processed_bytes=len(image_bytes)
+    )
+
+
+def preprocess_document_image(
+    image_bytes: Union[bytes, str],
+    max_dimension: Optional[int] = None,
+    jpeg_quality: Optional[int] = None,
+    crop: Optional[bool] = None
+) -> PreprocessedImage:
+    """
+    Auto-orient, crop, downscale and re-encode a document photo for OCR
+
+    Args:
+        image_bytes (Union[bytes, str]): Raw uploaded image, or the path of a spooled upload
+            (decoded straight from disk so the raw bytes are never held in memory)
+        max_dimension (Optional[int]): Longest edge after resizing
+        jpeg_quality (Optional[int]): JPEG quality of the re-encoded image
+        crop (Optional[bool]): Crop to the detected document
+
+    Returns:
+        PreprocessedImage: Re-encoded JPEG with its perceptual hash, or the
+            original bytes (no hash) if decoding fails
+    """
+    max_dimension = max_dimension or settings.ocr_image_max_dimension
+    jpeg_quality = jpeg_quality or settings.ocr_image_jpeg_quality
+    crop = settings.ocr_image_crop_enabled if crop is None else crop
+
+    is_path = isinstance(image_bytes, str)
+    original_size = os.path.getsize(image_bytes) if is_path else len(image_bytes)
+    try:
+        image = Image.open(image_bytes if is_path else io.BytesIO(image_bytes))
+        # An upright JPEG can be sent as-is when re-encoding would not shrink it
+        reusable = image.format == "JPEG" and image.getexif().get(EXIF_ORIENTATION, 1) == 1
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        logger.warning(f"Image pre-processing skipped, could not decode image: {str(e)}")
+        return _unprocessed(image_bytes)
+
+    cropped = False
+    if crop:
+        box = _find_document_box(image)
+        if box is not None and box != (0, 0, image.width, image.height):
+            image = image.crop(box)
+            cropped = True
+
+    size_before = image.size
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    resized = image.size != size_before
+
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=jpeg_quality, optimize=True)
+    data = output.getvalue()
+
+    if reusable and not cropped and not resized and len(data) >= original_size:
+        # Re-encoding an already compact JPEG made it bigger; keep the original
+        result = _unprocessed(image_bytes)
+        return result.model_copy(update={"width": image.width, "height": image.height, "phash": perceptual_hash(image)})
+
+    return PreprocessedImage(
+        data=data,
+        width=image.width,
+        height=image.height,
+        original_bytes=original_size,
+        processed_bytes=len(data),
+        cropped=cropped,
+        # Hashed after cropping so the background around the document does not count
+        phash=perceptual_hash(image)
+    )
+
+
+async def preprocess_document_image_async(image_bytes: Union[bytes, str], **kwargs) -> PreprocessedImage:
+    """
+    Run preprocess_document_image on the image worker pool and record the savings
+    """
+    if not settings.ocr_image_preprocessing_enabled:
+        return await asyncio.to_thread(_unprocessed, image_bytes)
+
+    result = await run_image_task(preprocess_document_image, image_bytes, **kwargs)
+    metrics.incr("image_preprocessing.images")
+    metrics.incr("image_preprocessing.bytes_saved", result.bytes_saved)
+    logger.info(
+        f"Pre-processed image {result.original_bytes} -> {result.processed_bytes} bytes "
+        f"({result.width}x{result.height}, cropped={result.cropped})"
+    )
+    return result
+
+
+def crop_face_region(
+    image_bytes: bytes,
+    bounding_box: Dict[str, float],
+    margin: float = 0.4,
+    max_dimension: int = 400,
+    jpeg_quality: int = 90
+) -> bytes:
+    """
+    Cut a face out of an image using a Rekognition BoundingBox
+
+    Args:
+        image_bytes (bytes): Image the bounding box was detected on
+        bounding_box (Dict[str, float]): Rekognition ratios (Left, Top, Width, Height)
+        margin (float): Extra context around the face as a fraction of its size,
+            so Rekognition can detect the face again in the crop
+        max_dimension (int): Longest edge of the crop
+        jpeg_quality (int): JPEG quality of the crop
+
+    Returns:
+        bytes: JPEG encoded face crop
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+
+    face_width = bounding_box["Width"] * image.width
+    face_height = bounding_box["Height"] * image.height
+    left = bounding_box["Left"] * image.width - face_width * margin
+    top = bounding_box["Top"] * image.height - face_height * margin
+    box = (
+        max(0, int(left)),
+        max(0, int(top)),
+        min(image.width, int(left + face_width * (1 + 2 * margin))),
+        min(image.height, int(top + face_height * (1 + 2 * margin))),
+    )
+
+    face = image.crop(box)
+    face.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    output = io.BytesIO()
+    face.save(output, format="JPEG", quality=jpeg_quality)
+    return output.getvalue()
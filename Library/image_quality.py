@@ -0,0 +1,99 @@
+import io
+import time
+from typing import Dict
+
+import numpy as np
+from loguru import logger
+from PIL import Image, ImageOps, UnidentifiedImageError
+from pydantic import BaseModel, Field
+
+from Library.config import settings
+from Library.metrics import metrics
+from Library.utils import run_image_task
+
+# Images are analysed at this size so sharpness scores do not depend on camera resolution
+ANALYSIS_MAX_DIMENSION = 640
+
+
+class SelfieQualityReport(BaseModel):
+    """
+    Outcome of the local selfie quality gate
+    """
+    passed: bool
+    checks: Dict[str, bool] = Field(description="Check name to pass/fail, keyed like FaceVerificationService checks")
+    measurements: Dict[str, float] = Field(default_factory=dict)
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """
+    Variance of the 4-neighbour Laplacian, a standard blur measure (low means blurry)
+
+    Args:
+        gray: 2D float array of grayscale intensities
+    """
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    laplacian = (
+        gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1] - 4 * gray[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+def prescreen_selfie(image_bytes: bytes) -> SelfieQualityReport:
+    """
+    Reject obviously unusable selfies before any AWS call
+
+    Checks file size, resolution, mean brightness and Laplacian-variance
+    sharpness on the decoded image. Thresholds come from the
+    selfie_prescreen_* settings.
+
+    Args:
+        image_bytes: Raw uploaded selfie
+
+    Returns:
+        SelfieQualityReport: Per-check results and the measured values
+    """
+    checks = {
+        "file_size_valid": (
+            settings.selfie_prescreen_min_bytes <= len(image_bytes) <= settings.selfie_prescreen_max_bytes
+        )
+    }
+    measurements = {"file_bytes": float(len(image_bytes))}
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning(f"Selfie could not be decoded: {str(e)}")
+        checks["image_decodable"] = False
+        return SelfieQualityReport(passed=False, checks=checks, measurements=measurements)
+
+    width, height = image.size
+    measurements.update({"width": float(width), "height": float(height)})
+    checks["resolution_valid"] = min(width, height) >= settings.selfie_prescreen_min_dimension
+
+    gray = image.convert("L")
+    gray.thumbnail((ANALYSIS_MAX_DIMENSION, ANALYSIS_MAX_DIMENSION))
+    pixels = np.asarray(gray, dtype=np.float32)
+
+    brightness = float(pixels.mean())
+    sharpness = laplacian_variance(pixels)
+    measurements.update({"brightness": brightness, "sharpness": sharpness})
+    checks["quality_brightness"] = (
+        settings.selfie_prescreen_min_brightness <= brightness <= settings.selfie_prescreen_max_brightness
+    )
+    checks["quality_sharpness"] = sharpness >= settings.selfie_prescreen_min_sharpness
+
+    return SelfieQualityReport(passed=all(checks.values()), checks=checks, measurements=measurements)
+
+
+async def prescreen_selfie_async(image_bytes: bytes) -> SelfieQualityReport:
+    """
+    Run prescreen_selfie on the image worker pool and record its outcome
+    """
+    started = time.perf_counter()
+    report = await run_image_task(prescreen_selfie, image_bytes)
+    metrics.observe("selfie_prescreen.latency", time.perf_counter() - started)
+    metrics.incr("selfie_prescreen.passed" if report.passed else "selfie_prescreen.rejected")
+    logger.info(f"Selfie prescreen: passed={report.passed}, measurements={report.measurements}")
+    return report
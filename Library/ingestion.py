@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from loguru import logger
+from pydantic import BaseModel
+
+from Library.config import settings
+from Library.metrics import metrics
+
+# Leading bytes of the image formats the OCR and face pipelines accept
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "image/jpeg",
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+}
+
+
+class UploadRejectedError(Exception):
+    """
+    The upload is not an accepted image or exceeds the size limit
+
+    Attributes:
+        too_large (bool): True when the size limit was exceeded
+    """
+    def __init__(self, message: str, too_large: bool = False):
+        super().__init__(message)
+        self.too_large = too_large
+
+
+class IngestedFile(BaseModel):
+    """
+    An upload spooled to a temporary file. Consumers (S3, pre-processing)
+    open the file themselves, so the upload is never held in memory in full.
+    """
+    path: str
+    size: int
+    sha256: str
+    media_type: str
+
+    def read(self) -> bytes:
+        """Whole file contents, for consumers that need the bytes (bounded by the upload limit)"""
+        with open(self.path, "rb") as fh:
+            return fh.read()
+
+    def close(self) -> None:
+        """Delete the temporary file"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_chunk(fh, digest, chunk: bytes) -> None:
+    # Hashing a 1 MB chunk takes milliseconds; do it in the same thread hop as the write
+    digest.update(chunk)
+    fh.write(chunk)
+
+
+def detect_image_type(head: bytes) -> Optional[str]:
+    """
+    Media type from an image's leading bytes, or None if it is not an accepted image
+    """
+    for signature, media_type in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return media_type
+    return None
+
+
+async def ingest_upload(upload, max_bytes: Optional[int] = None, chunk_size: Optional[int] = None) -> IngestedFile:
+    """
+    Stream an upload to a temporary file, validating it on the way
+
+    The first chunk is checked for an image signature, the sha256 is computed
+    incrementally and reading stops as soon as max_bytes is exceeded.
+
+    Args:
+        upload: FastAPI UploadFile (anything with an async read(size))
+        max_bytes (Optional[int]): Size limit, defaults to settings.max_upload_bytes
+        chunk_size (Optional[int]): Read size, defaults to settings.upload_chunk_bytes
+
+    Returns:
+        IngestedFile: Spooled file; the caller must close() it
+
+    Raises:
+        UploadRejectedError: If the upload is not an accepted image or is too large
+    """
+    max_bytes = max_bytes or settings.max_upload_bytes
+    chunk_size = chunk_size or settings.upload_chunk_bytes
+
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=settings.upload_spool_dir)
+    digest = hashlib.sha256()
+    size = 0
+    media_type = None
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                if media_type is None:
+                    media_type = detect_image_type(chunk)
+                    if media_type is None:
+                        raise UploadRejectedError("File content is not a JPEG, PNG or GIF image")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejectedError(
+                        f"File exceeds the maximum upload size of {max_bytes // (1024 * 1024)}MB",
+                        too_large=True
+                    )
+                await asyncio.to_thread(_write_chunk, fh, digest, chunk)
+        if media_type is None:
+            raise UploadRejectedError("File is empty")
+    except BaseException:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        metrics.incr("uploads.rejected")
+        raise
+
+    metrics.incr("uploads.ingested")
+    metrics.incr("uploads.bytes", size)
+    logger.info(f"Ingested upload ({media_type}, {size} bytes)")
+    return IngestedFile(path=path, size=size, sha256=digest.hexdigest(), media_type=media_type)
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+import anthropic
+import httpx
+from langchain_anthropic import ChatAnthropic
+from loguru import logger
+
+from Library.config import settings
+from Library.metrics import metrics
+
+# Opt-in header for prompt caching on API versions where it is still in beta
+PROMPT_CACHING_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+
+
+class LLMConcurrencyLimiter:
+    """
+    Async limiter bounding the number of in-flight LLM requests
+    """
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+
+    async def __aenter__(self) -> "LLMConcurrencyLimiter":
+        started = time.perf_counter()
+        await self._semaphore.acquire()
+        metrics.observe("llm.limiter_wait", time.perf_counter() - started)
+        self.in_flight += 1
+        metrics.set_gauge("llm.in_flight", self.in_flight)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.in_flight -= 1
+        metrics.set_gauge("llm.in_flight", self.in_flight)
+        self._semaphore.release()
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+_chat_models: Dict[Tuple[str, int], ChatAnthropic] = {}
+_limiter: Optional[LLMConcurrencyLimiter] = None
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Shared keep-alive connection pool for every Anthropic request in the process
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_http_max_connections,
+                max_keepalive_connections=settings.llm_http_max_keepalive_connections
+            ),
+            timeout=httpx.Timeout(settings.llm_request_timeout_seconds, connect=10.0)
+        )
+        logger.info(
+            f"Created pooled LLM HTTP client (max_connections={settings.llm_http_max_connections})"
+        )
+    return _http_client
+
+
+def get_chat_model(model: str, max_tokens: int) -> ChatAnthropic:
+    """
+    Get the process-wide ChatAnthropic for a model, bound to the shared pool
+
+    Args:
+        model (str): Claude model name
+        max_tokens (int): Maximum tokens for response
+
+    Returns:
+        ChatAnthropic: Chat model whose async client uses the shared pool
+    """
+    key = (model, max_tokens)
+    chat_model = _chat_models.get(key)
+    if chat_model is None:
+        chat_model = ChatAnthropic(
+            model_name=model,
+            max_tokens_to_sample=max_tokens,
+            anthropic_api_key=settings.anthropic_api_key,
+            anthropic_api_url=settings.anthropic_api_url,
+            # Retries are handled by Library.resilience so they respect the request deadline
+            max_retries=0,
+            default_request_timeout=settings.llm_request_timeout_seconds,
+            default_headers=PROMPT_CACHING_HEADERS if settings.llm_prompt_caching_enabled else None
+        )
+        # langchain-anthropic (pinned in requirements.txt) has no option for the httpx
+        # client, so point a copy of its async client at the shared pool. Fail loudly if an
+        # upgrade changes the attribute rather than silently opening a pool per model.
+        async_client = getattr(chat_model, "_async_client", None)
+        if not isinstance(async_client, anthropic.AsyncAnthropic):
+            raise RuntimeError(
+                "ChatAnthropic no longer exposes an AsyncAnthropic _async_client; "
+                "update get_chat_model for the installed langchain-anthropic"
+            )
+        chat_model._async_client = async_client.with_options(http_client=get_async_http_client())
+        _chat_models[key] = chat_model
+    return chat_model
+
+
+def get_llm_limiter() -> LLMConcurrencyLimiter:
+    """
+    Process-wide limiter for concurrent LLM calls
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = LLMConcurrencyLimiter(settings.llm_max_concurrency)
+    return _limiter
+
+
+async def warm_up_llm_connections() -> None:
+    """
+    Complete TCP/TLS handshakes with the Anthropic API so the first OCR
+    request does not pay for them. Any HTTP status counts as success.
+    """
+    client = get_async_http_client()
+    started = time.perf_counter()
+
+    async def _open_connection() -> None:
+        try:
+            await client.head(settings.anthropic_api_url)
+        except httpx.HTTPError as e:
+            logger.warning(f"LLM connection warm-up failed: {str(e)}")
+
+    await asyncio.gather(*[_open_connection() for _ in range(settings.llm_warmup_connections)])
+    logger.info(
+        f"Warmed up {settings.llm_warmup_connections} LLM connection(s) "
+        f"in {time.perf_counter() - started:.3f}s"
+    )
+
+
+async def close_llm_clients() -> None:
+    """Close the shared connection pool (called on application shutdown)"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+        logger.info("Closed pooled LLM HTTP client")
+    _http_client = None
+    _chat_models.clear()
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+
+class LatencyWindow:
+    """
+    Rolling window of latency observations with running totals
+    """
+    def __init__(self, window_size: int = 1024):
+        self.samples: Deque[float] = deque(maxlen=window_size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Percentile over the rolling window
+
+        Args:
+            pct (float): Percentile between 0 and 100
+
+        Returns:
+            Optional[float]: Latency in seconds, None if nothing was observed yet
+        """
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "avg": (self.total / self.count) if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+        }
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry (counters, gauges and latency windows)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._collectors: Dict[str, Callable[[], Dict]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            window = self._latencies.get(name)
+            if window is None:
+                window = self._latencies[name] = LatencyWindow()
+            window.observe(seconds)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        with self._lock:
+            window = self._latencies.get(name)
+            return window.percentile(pct) if window else None
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict]) -> None:
+        """
+        Register a callable whose output is included in every snapshot
+
+        Args:
+            name (str): Section name in the snapshot
+            collector (Callable): Returns a JSON-serialisable dict
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            data = {
+                "timestamp": time.time(),
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "latencies": {name: w.snapshot() for name, w in self._latencies.items()},
+            }
+            collectors = dict(self._collectors)
+
+        for name, collector in collectors.items():
+            data[name] = collector()
+        return data
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task that sleeps for a fixed
+    interval. Any lag is time the loop spent running something else without
+    yielding (e.g. CPU-bound work on the loop thread) and is added to the
+    latency of every concurrent request.
+    """
+    def __init__(self, interval: float = 0.1, name: str = "event_loop.lag", registry: Optional[MetricsRegistry] = None):
+        self.interval = interval
+        self.name = name
+        self.registry = registry or metrics
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.registry.observe(self.name, lag)
+            self.registry.set_gauge(self.name, lag)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from Library.config import settings
+from Library.metrics import metrics
+
+
+class DiskCacheTier:
+    """
+    Persistent cache tier storing one JSON file per key
+    """
+    def __init__(self, directory: str, ttl_seconds: int, max_entries: int = 10000):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write(self, key: str, entry: Dict) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(entry, fh)
+        os.replace(tmp_path, path)
+
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Drop expired files, then the oldest ones above max_entries"""
+        files = []
+        now = time.time()
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                mtime = os.path.getmtime(path)
+                if now - mtime > self.ttl_seconds:
+                    os.remove(path)
+                else:
+                    files.append((mtime, path))
+
+        overflow = len(files) - self.max_entries
+        if overflow > 0:
+            for _, path in sorted(files)[:overflow]:
+                os.remove(path)
+            logger.info(f"OCR disk cache evicted {overflow} entries")
+
+    async def get(self, key: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, entry: Dict) -> None:
+        await asyncio.to_thread(self._write, key, entry)
+
+
+class RedisCacheTier:
+    """
+    Persistent cache tier backed by Redis, expiry handled by key TTLs
+    """
+    def __init__(self, redis_url: str, ttl_seconds: int, prefix: str = "ocr-cache:"):
+        from redis import asyncio as aioredis
+
+        self.client = aioredis.from_url(redis_url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Dict]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, entry: Dict) -> None:
+        await self.client.set(self.prefix + key, json.dumps(entry), ex=self.ttl_seconds)
+
+
+class OCRResultCache:
+    """
+    Two-tier content-addressed cache for OCR extraction results.
+
+    The first tier is a bounded in-memory LRU; the optional second tier
+    (disk or Redis) survives restarts and is shared between workers.
+    Entries are JSON-serialisable payloads plus the latency of the LLM
+    call that produced them, so every hit can be credited with the time
+    it saved.
+    """
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: int = 86400,
+        persistent_tier: Optional[Any] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent_tier = persistent_tier
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.latency_saved_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "OCRResultCache":
+        persistent_tier = None
+        backend = (settings.ocr_cache_persistent_backend or "").lower()
+        if backend == "disk":
+            persistent_tier = DiskCacheTier(
+                settings.ocr_cache_disk_path,
+                ttl_seconds=settings.ocr_cache_ttl_seconds
+            )
+        elif backend == "redis":
+            if not settings.redis_url:
+                raise ValueError("OCR_CACHE_PERSISTENT_BACKEND=redis requires REDIS_URL")
+            persistent_tier = RedisCacheTier(
+                settings.redis_url,
+                ttl_seconds=settings.ocr_cache_ttl_seconds
+            )
+
+        logger.info(
+            f"OCR result cache: max_entries={settings.ocr_cache_max_entries}, "
+            f"ttl={settings.ocr_cache_ttl_seconds}s, persistent_tier={backend or 'none'}"
+        )
+        return cls(
+            max_entries=settings.ocr_cache_max_entries,
+            ttl_seconds=settings.ocr_cache_ttl_seconds,
+            persistent_tier=persistent_tier
+        )
+
+    @staticmethod
+    def make_key(image_base64: str, **context: Any) -> str:
+        """
+        Build a content address for an image and its extraction context
+
+        Args:
+            image_base64 (str): Base64 encoded image
+            **context: Anything else that changes the output (document type,
+                model name, prompt version, ...)
+
+        Returns:
+            str: Hex sha256 digest
+        """
+        digest = hashlib.sha256()
+        for name in sorted(context):
+            digest.update(f"{name}={context[name]}\x00".encode("utf-8"))
+        digest.update(image_base64.encode("ascii"))
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached payload, promoting persistent hits into memory
+
+        Returns:
+            Optional[Dict]: Cached payload or None on miss
+        """
+        entry = self._get_memory(key)
+        if entry is None and self.persistent_tier is not None:
+            try:
+                entry = await self.persistent_tier.get(key)
+            except Exception as e:
+                logger.warning(f"OCR cache persistent tier read failed: {str(e)}")
+                entry = None
+            if entry is not None:
+                self.persistent_hits += 1
+                self._set_memory(key, entry)
+
+        if entry is None:
+            self.misses += 1
+            metrics.incr("ocr_cache.misses")
+            return None
+
+        self.hits += 1
+        saved = entry.get("latency_s", 0.0)
+        self.latency_saved_seconds += saved
+        metrics.incr("ocr_cache.hits")
+        metrics.incr("ocr_cache.latency_saved_seconds", saved)
+        return entry["payload"]
+
+    async def set(self, key: str, payload: Dict, latency_s: float = 0.0) -> None:
+        """
+        Store a payload in every tier
+
+        Args:
+            key (str): Content address from make_key
+            payload (Dict): JSON-serialisable result
+            latency_s (float): Latency of the call that produced the payload
+        """
+        entry = {"payload": payload, "latency_s": latency_s, "stored_at": time.time()}
+        self._set_memory(key, entry)
+        if self.persistent_tier is not None:
+            try:
+                await self.persistent_tier.set(key, entry)
+            except Exception as e:
+                logger.warning(f"OCR cache persistent tier write failed: {str(e)}")
+
+    def _get_memory(self, key: str) -> Optional[Dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if time.time() > expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set_memory(self, key: str, entry: Dict) -> None:
+        self._entries[key] = (time.time() + self.ttl_seconds, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            metrics.incr("ocr_cache.evictions")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "llm_calls_saved": self.hits,
+            "latency_saved_seconds": round(self.latency_saved_seconds, 3),
+        }
+
+
+def create_ocr_cache() -> Optional[OCRResultCache]:
+    """
+    Build the process-wide OCR cache from settings (None when disabled)
+    """
+    if not settings.ocr_cache_enabled:
+        logger.info("OCR result cache disabled")
+        return None
+    cache = OCRResultCache.from_settings()
+    metrics.register_collector("ocr_cache", cache.stats)
+    return cache
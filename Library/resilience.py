@@ -0,0 +1,332 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel
+
+from Library.metrics import metrics
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, overload
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call cannot complete before its deadline"""
+
+
+class RetryPolicy(BaseModel):
+    """
+    Exponential backoff with full jitter
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Delay before the next attempt
+
+        Args:
+            attempt (int): Number of attempts already made (1-based)
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+def is_retryable_llm_error(error: BaseException) -> bool:
+    """
+    Whether an Anthropic/httpx error is transient
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # anthropic.APIConnectionError / APITimeoutError and httpx transport errors
+    return any(
+        name in type(error).__name__
+        for name in ("Timeout", "Connection", "Transport", "RemoteProtocol")
+    )
+
+
+async def call_with_retries(
+    fn: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    deadline: Optional[float] = None,
+    is_retryable: Callable[[BaseException], bool] = is_retryable_llm_error,
+    name: str = "call"
+) -> T:
+    """
+    Call fn, retrying transient failures until the attempts or the deadline run out
+
+    Args:
+        fn: Zero-argument coroutine factory, called once per attempt
+        policy (RetryPolicy): Attempts and backoff
+        deadline (Optional[float]): Absolute time.monotonic() deadline
+        is_retryable: Classifies failures as transient
+        name (str): Metrics prefix
+
+    Returns:
+        Result of the first successful attempt
+
+    Raises:
+        DeadlineExceeded: If the deadline passes before a successful attempt
+        Exception: The last error once retries are exhausted or it is not retryable
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            metrics.incr(f"{name}.deadline_exceeded")
+            raise DeadlineExceeded(f"{name} deadline exceeded after {attempt - 1} attempt(s)")
+
+        try:
+            result = await asyncio.wait_for(fn(), timeout=remaining)
+            metrics.incr(f"{name}.success")
+            if attempt > 1:
+                metrics.incr(f"{name}.success_after_retry")
+            return result
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError) and deadline is not None and time.monotonic() >= deadline:
+                metrics.incr(f"{name}.deadline_exceeded")
+                raise DeadlineExceeded(f"{name} deadline exceeded after {attempt} attempt(s)") from e
+
+            delay = policy.backoff(attempt)
+            out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+            if attempt >= policy.max_attempts or out_of_time or not is_retryable(e):
+                metrics.incr(f"{name}.failed")
+                raise
+
+            metrics.incr(f"{name}.retries")
+            logger.warning(
+                f"{name} attempt {attempt} failed ({type(e).__name__}: {str(e)}), retrying in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+
+
+async def hedged(
+    fn: Callable[[], Awaitable[T]],
+    hedge_after: Optional[float],
+    name: str = "call"
+) -> T:
+    """
+    Start a second identical request if the first has not finished in time
+
+    Whichever request succeeds first wins and the other is cancelled. If the
+    first request fails before the hedge fires, its error propagates.
+
+    Args:
+        fn: Zero-argument coroutine factory
+        hedge_after (Optional[float]): Seconds to wait before hedging, None disables hedging
+        name (str): Metrics prefix
+    """
+    if hedge_after is None:
+        return await fn()
+
+    primary = asyncio.ensure_future(fn())
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        metrics.incr(f"{name}.hedges")
+        logger.info(f"{name} slower than {hedge_after:.2f}s, sending hedged request")
+        backup = asyncio.ensure_future(fn())
+        tasks.add(backup)
+
+        pending = set(tasks)
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is backup:
+                        metrics.incr(f"{name}.hedges_won")
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        # Cancel the loser, or everything if we were cancelled ourselves
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+class ServiceUnavailableError(Exception):
+    """
+    A dependency is throttling or degraded; the request can be retried later
+
+    Attributes:
+        retry_after (float): Suggested seconds before retrying
+    """
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit: grows by roughly one slot per window of successful
+    calls and is cut multiplicatively whenever the dependency throttles
+
+    Usage:
+        await limiter.acquire()
+        try:
+            ...
+        finally:
+            limiter.release(throttled=...)
+    """
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.5
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _publish(self) -> None:
+        metrics.set_gauge(f"{self.name}.limit", self.limit)
+        metrics.set_gauge(f"{self.name}.in_flight", self._in_flight)
+
+    async def acquire(self) -> None:
+        started = time.perf_counter()
+        while self._in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken by release() but cancelled before taking the slot: pass the wakeup on
+                    self._wake_waiters()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._in_flight += 1
+        metrics.observe(f"{self.name}.wait", time.perf_counter() - started)
+        self._publish()
+
+    def release(self, throttled: bool = False, succeeded: bool = True) -> None:
+        """
+        Return a slot and adapt the limit to the call's outcome
+
+        Args:
+            throttled (bool): The dependency rejected the call for capacity reasons
+            succeeded (bool): The call completed; other failures leave the limit unchanged
+        """
+        self._in_flight -= 1
+        if throttled:
+            self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+            metrics.incr(f"{self.name}.throttled")
+            logger.warning(f"{self.name} throttled, concurrency limit lowered to {self.limit}")
+        elif succeeded:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+        self._publish()
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        """Wake as many waiters as there are free slots; each re-checks the limit"""
+        free = self.limit - self._in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+class CircuitBreaker:
+    """
+    Fails fast once a dependency keeps failing
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected with ServiceUnavailableError for recovery_timeout seconds.
+    Then a single probe call is let through (half-open): success closes the
+    circuit, failure re-opens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        metrics.set_gauge(f"{self.name}.circuit_open", 0)
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            ServiceUnavailableError: If the circuit is open
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                metrics.incr(f"{self.name}.circuit_rejected")
+                raise ServiceUnavailableError(f"{self.name} is unavailable", retry_after=self.retry_after())
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                metrics.incr(f"{self.name}.circuit_rejected")
+                raise ServiceUnavailableError(f"{self.name} is recovering", retry_after=1.0)
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"{self.name} circuit closed")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+        metrics.set_gauge(f"{self.name}.circuit_open", 0)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.error(f"{self.name} circuit opened after {self._failures} failure(s)")
+                metrics.incr(f"{self.name}.circuit_opened")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+            metrics.set_gauge(f"{self.name}.circuit_open", 1)
+
+    def record_neutral(self) -> None:
+        """
+        A call that says nothing about the dependency's health (e.g. a client
+        error, throttling or cancellation)
+
+        A half-open circuit stays half-open and lets the next call probe again.
+        """
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
@@ -1,15 +1,38 @@
 import base64
 import asyncio
-from typing import List, Optional, Dict, Union
+import functools
+import hashlib
+import multiprocessing
+import re
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from multiprocessing import shared_memory
+from typing import Any, Callable, List, NamedTuple, Optional, Dict, Tuple, Union
 from pydantic import BaseModel, Field, ConfigDict
 from Library.config import settings
-from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from loguru import logger
+from Library.ocr_cache import OCRResultCache
+from Library.duplicate_index import PerceptualHashIndex
+from Library.metrics import metrics
+from Library.llm_client import get_chat_model, get_llm_limiter, warm_up_llm_connections
+from Library.resilience import RetryPolicy, call_with_retries, hedged
+from Library.extraction_profiles import ExtractionProfile, build_profile_schema, get_extraction_profile
 import os
 
+# Bump whenever the extraction prompt or DocumentInfo schema changes so that
+# cached results produced by the old prompt are no longer served.
+OCR_PROMPT_VERSION = "3"
+
 class DocumentInfo(BaseModel):
     """
-    Structured model for document information extraction
+    Structured model for document information extraction.
+
+    Holds every extractable field; the schema actually sent to the model is
+    generated per extraction profile (see Library/extraction_profiles.py),
+    so fields a profile skips are left as None.
     """
     model_config = ConfigDict(extra='forbid')
     
@@ -20,11 +43,11 @@ class DocumentInfo(BaseModel):
     nationality: Optional[str] = Field(default=None, description="Nationality of the individual")
     gender: Optional[str] = Field(default=None, description="Gender/Sex of the individual")
     address: Optional[str] = Field(default=None, description="Address if shown on document")
-    raw_text: str = Field(description="The complete raw text extracted from the document")
+    raw_text: Optional[str] = Field(default=None, description="The complete raw text extracted from the document")
 
-    id_card_issue_date: str= Field(description="the Date the card or document was issued to the individual")
-    id_card_expiry_date: str= Field(description="the Date the card or document is expected to expire")
-    where_born: str = Field(description="the Location where the individual was born")
+    id_card_issue_date: Optional[str] = Field(default=None, description="the Date the card or document was issued to the individual")
+    id_card_expiry_date: Optional[str] = Field(default=None, description="the Date the card or document is expected to expire")
+    where_born: Optional[str] = Field(default=None, description="the Location where the individual was born")
     father_name: Optional[str] = Field(default=None, description="Father's name if shown on document")
     father_occupation: Optional[str] = Field(default=None, description="Father's occupation if shown on document")
     mother_name: Optional[str] = Field(default=None, description="Mother's name if shown on document")
@@ -43,14 +66,146 @@ class DocumentExtractionResult(BaseModel):
     document_info: Optional[DocumentInfo] = Field(default=None, description="Structured document information")
     additional_details: Optional[Dict[str, str]] = Field(default=None, description="Any additional details or error information")
 
+class MultiDocumentExtractionResult(BaseModel):
+    """
+    Per-document results plus cross-document consistency flags
+    """
+    results: List[DocumentExtractionResult]
+    consistency: Dict[str, Optional[bool]] = Field(default_factory=dict)
+    mode: str = "fan_out"
+    profile: str = "full"
+    near_duplicates: List[Optional[Dict]] = Field(
+        default_factory=list,
+        description=(
+            "Per document: the closest earlier submission (distance, sessions, flagged, exact, same_session) or None"
+        )
+    )
+
+DATE_FORMATS = (
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d", "%Y/%m/%d",
+    "%d %B %Y", "%d %b %Y", "%B %d, %Y", "%b %d, %Y", "%d/%m/%y", "%d%m%Y",
+)
+
+def parse_document_date(value: Optional[str]) -> Optional[date]:
+    """
+    Parse a date as printed on an identity document
+
+    Args:
+        value (Optional[str]): Date string in any of the common document formats
+
+    Returns:
+        Optional[date]: Parsed date or None if it cannot be parsed
+    """
+    if not value:
+        return None
+    cleaned = re.sub(r"\s+", " ", value.strip())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def _name_tokens(name: Optional[str]) -> set:
+    return set(re.findall(r"[^\W\d_]+", (name or "").upper()))
+
+def check_document_consistency(infos: List[Optional[DocumentInfo]]) -> Dict[str, Optional[bool]]:
+    """
+    Compare identity fields across documents belonging to the same person
+
+    Args:
+        infos (List[Optional[DocumentInfo]]): Extracted documents (None for failures)
+
+    Returns:
+        Dict[str, Optional[bool]]: name_match and dob_match, None when fewer than
+        two documents could be compared
+    """
+    present = [info for info in infos if info is not None]
+    if len(present) < 2:
+        return {"name_match": None, "dob_match": None}
+
+    names = [_name_tokens(info.full_name) for info in present]
+    name_match = all(names[0] == other for other in names[1:]) and bool(names[0])
+
+    dates = [parse_document_date(info.date_of_birth) for info in present]
+    if all(dates):
+        dob_match = all(dates[0] == other for other in dates[1:])
+    else:
+        digits = [re.sub(r"\D", "", info.date_of_birth or "") for info in present]
+        dob_match = all(digits[0] == other for other in digits[1:]) and bool(digits[0])
+
+    return {"name_match": name_match, "dob_match": dob_match}
+
+# Identity fields every extraction must produce before it is accepted
+IDENTITY_FIELDS = ("full_name", "date_of_birth", "identification_number")
+
+# Known ID card number formats (normalised to upper case without spaces)
+ID_CARD_NUMBER_PATTERNS = (
+    re.compile(r"^GHA-\d{9}-\d$"),        # Ghana Card
+    re.compile(r"^[A-Z]{1,2}\d{6,9}$"),     # Passport / legacy national ID
+    re.compile(r"^\d{8,14}$"),              # Numeric national ID
+)
+# Other documents (birth certificates, ...) only need a plausible reference
+GENERIC_DOCUMENT_NUMBER_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9\-/.]{2,29}$")
+
+EMPTY_VALUES = {"", "NONE", "NULL", "N/A", "NA", "-"}
+
+def _is_empty(value: Optional[str]) -> bool:
+    return value is None or value.strip().upper() in EMPTY_VALUES
+
+def validate_document_info(info: Optional[DocumentInfo], document_type: str = "ID Card") -> List[str]:
+    """
+    Sanity-check an extraction before accepting it from a cheaper model tier
+
+    Args:
+        info (Optional[DocumentInfo]): Extracted information
+        document_type (str): Type of document that was processed
+
+    Returns:
+        List[str]: Validation issues, empty when the extraction looks sound
+    """
+    if info is None:
+        return ["no document information returned"]
+
+    issues = [f"missing {name}" for name in IDENTITY_FIELDS if _is_empty(getattr(info, name))]
+
+    if not _is_empty(info.date_of_birth):
+        dob = parse_document_date(info.date_of_birth)
+        if dob is None:
+            issues.append(f"unparseable date_of_birth '{info.date_of_birth}'")
+        elif not (date(1900, 1, 1) <= dob <= date.today()):
+            issues.append(f"implausible date_of_birth '{info.date_of_birth}'")
+
+    for name in ("id_card_issue_date", "id_card_expiry_date"):
+        value = getattr(info, name)
+        if not _is_empty(value) and parse_document_date(value) is None:
+            issues.append(f"unparseable {name} '{value}'")
+
+    if not _is_empty(info.identification_number):
+        number = re.sub(r"\s+", "", info.identification_number.upper())
+        if "ID" in document_type.upper():
+            if not any(pattern.match(number) for pattern in ID_CARD_NUMBER_PATTERNS):
+                issues.append(f"identification_number '{info.identification_number}' matches no known ID format")
+        elif not GENERIC_DOCUMENT_NUMBER_PATTERN.match(number):
+            issues.append(f"implausible identification_number '{info.identification_number}'")
+
+    return issues
+
 class DocumentOCRProcessor:
     """
-    Async Document OCR Processor using Langchain and Claude
+    Async Document OCR Processor using Langchain and Claude.
+
+    When a fast model is configured, every document is first extracted with
+    it and only escalated to the main model if the result fails
+    validate_document_info.
     """
     def __init__(
         self, 
         model: str = "claude-3-opus-20240229", 
-        max_tokens: int = 4096
+        max_tokens: int = 4096,
+        cache: Optional[OCRResultCache] = None,
+        fast_model: Optional[str] = None,
+        chat_model_factory: Optional[Callable[[str, int], Any]] = None
     ):
         """
         Initialize the OCR processor with Claude model
@@ -58,18 +213,230 @@ class DocumentOCRProcessor:
         Args:
             model (str): Claude model to use
             max_tokens (int): Maximum tokens for response
+            cache (Optional[OCRResultCache]): Result cache, None disables caching
+            fast_model (Optional[str]): Cheaper model tried first, None disables the cascade
+            chat_model_factory (Optional[Callable]): Builds the chat model for a model name,
+                defaults to the shared pooled ChatAnthropic (swap in a stub for local testing)
         """
-        base_model = ChatAnthropic(
-            model_name=model,
-            max_tokens_to_sample=max_tokens,
-            anthropic_api_key=settings.anthropic_api_key
+        self.model = model
+        self.models = [fast_model, model] if fast_model and fast_model != model else [model]
+        self.cache = cache
+        self.limiter = get_llm_limiter()
+        chat_model_factory = chat_model_factory or get_chat_model
+        self.base_models = {name: chat_model_factory(name, max_tokens) for name in self.models}
+        self._structured_llms: Dict[Tuple[str, str, bool], Any] = {}
+        self._system_messages: Dict[Tuple[str, bool], SystemMessage] = {}
+        self.retry_policy = RetryPolicy(
+            max_attempts=settings.llm_retry_max_attempts,
+            base_delay=settings.llm_retry_base_delay,
+            max_delay=settings.llm_retry_max_delay
         )
-        self.llm = base_model.with_structured_output(DocumentInfo, name="extract_document_info")
+        # Bind the default profile up front so the first request does not pay for it
+        for name in self.models:
+            self._structured_llm(get_extraction_profile(), model=name)
+        metrics.register_collector("ocr_cascade", self.cascade_stats)
+
+    def _structured_llm(self, profile: ExtractionProfile, multi: bool = False, model: Optional[str] = None) -> Any:
+        """
+        Structured-output binding for a model and profile, built once and reused
+        """
+        model = model or self.model
+        key = (model, profile.name, multi)
+        if key not in self._structured_llms:
+            self._structured_llms[key] = self.base_models[model].with_structured_output(
+                build_profile_schema(DocumentInfo, profile, multi=multi),
+                name="extract_documents_info" if multi else "extract_document_info",
+                include_raw=True
+            )
+        return self._structured_llms[key]
+
+    def _system_message(self, profile: ExtractionProfile, multi: bool = False) -> SystemMessage:
+        """
+        Static OCR instructions for a profile, marked for provider-side prompt caching.
+
+        Anthropic caches the prompt prefix in the order tools -> system -> messages,
+        so the cache breakpoint on the system block covers the tool schema as well.
+        Everything that varies per request (document type, images) goes in the
+        human message after it.
+        """
+        key = (profile.name, multi)
+        if key not in self._system_messages:
+            if multi:
+                task = (
+                    "You are given several document images belonging to the same person. "
+                    "Extract the required information from each image separately and return the answer in the language of the document.\n"
+                    "Return exactly one entry per image, in the same order as the images."
+                )
+                tool_name = "extract_documents_info"
+                extra_rule = "- Do NOT copy values between documents\n"
+            else:
+                task = (
+                    "Analyze the document image and extract the required information "
+                    "and return the answer in the language of the document."
+                )
+                tool_name = "extract_document_info"
+                extra_rule = ""
+
+            text = (
+                f"{task}\n"
+                f"{profile.instructions}\n\n"
+                "IMPORTANT:\n"
+                "- Be precise and structured\n"
+                "- If information is partially visible or unclear, mark as None\n"
+                "- Do NOT hallucinate or make up information\n"
+                f"{extra_rule}"
+                "- Preserve the exact format of dates and numbers\n"
+                "- For names, combine surname and firstname if they are separate\n"
+                "- Extract any ID numbers or document numbers shown\n\n"
+                f"Call the {tool_name} function with the extracted information."
+            )
+            block: Dict[str, Any] = {"type": "text", "text": text}
+            if settings.llm_prompt_caching_enabled:
+                block["cache_control"] = {"type": "ephemeral"}
+            self._system_messages[key] = SystemMessage(content=[block])
+        return self._system_messages[key]
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """
+        Delay after which a hedged request is sent: the model's observed latency
+        percentile, or None when hedging is disabled, there is not enough history
+        yet or the hedge budget is spent
+        """
+        if not settings.llm_hedging_enabled:
+            return None
+        if metrics.counter(f"ocr.llm_attempt_count.{model}") < settings.llm_hedge_min_samples:
+            return None
+        calls = metrics.counter("ocr.llm.success") + metrics.counter("ocr.llm.failed")
+        if calls and metrics.counter("ocr.llm.hedges") / calls >= settings.llm_hedge_budget_ratio:
+            return None
+        return metrics.percentile(f"ocr.llm_attempt_latency.{model}", settings.llm_hedge_percentile)
+
+    async def _invoke(
+        self,
+        llm: Any,
+        messages: List[BaseMessage],
+        model: str,
+        deadline: Optional[float] = None
+    ) -> Tuple[Any, Dict[str, str], float]:
+        """
+        Run a structured-output call with retries (and optional hedging) and
+        collect latency and token usage
+
+        Args:
+            deadline (Optional[float]): Absolute time.monotonic() deadline for all attempts
+
+        Returns:
+            Tuple[Any, Dict[str, str], float]: Parsed model, call details and latency in seconds
+        """
+        async def _attempt() -> Dict:
+            async with self.limiter:
+                attempt_started = time.perf_counter()
+                response = await llm.ainvoke(messages)
+            metrics.incr(f"ocr.llm_attempt_count.{model}")
+            metrics.observe(f"ocr.llm_attempt_latency.{model}", time.perf_counter() - attempt_started)
+            return response
+
+        started = time.perf_counter()
+        response = await call_with_retries(
+            lambda: hedged(_attempt, self._hedge_delay(model), name="ocr.llm"),
+            self.retry_policy,
+            deadline=deadline,
+            name="ocr.llm"
+        )
+        latency = time.perf_counter() - started
+        metrics.observe("ocr.llm_latency", latency)
+        metrics.observe(f"ocr.llm_latency.{model}", latency)
+
+        if response.get("parsing_error"):
+            raise response["parsing_error"]
+
+        usage = getattr(response.get("raw"), "usage_metadata", None) or {}
+        token_details = usage.get("input_token_details") or {}
+        cache_read = token_details.get("cache_read") or 0
+        cache_creation = token_details.get("cache_creation") or 0
+        metrics.incr("llm.prompt_cache.read_tokens", cache_read)
+        metrics.incr("llm.prompt_cache.write_tokens", cache_creation)
+        details = {
+            "latency_ms": f"{latency * 1000:.0f}",
+            "input_tokens": str(usage.get("input_tokens", 0)),
+            "output_tokens": str(usage.get("output_tokens", 0)),
+            "cache_read_input_tokens": str(cache_read),
+            "cache_creation_input_tokens": str(cache_creation),
+        }
+        return response.get("parsed"), details, latency
+
+    async def _run_cascade(
+        self,
+        profile: ExtractionProfile,
+        messages: List[BaseMessage],
+        validate: Callable[[Any], List[str]],
+        multi: bool = False,
+        deadline: Optional[float] = None
+    ) -> Tuple[Any, Dict[str, str], float]:
+        """
+        Try each model tier in order, escalating while the output fails validation
+
+        Returns:
+            Tuple[Any, Dict[str, str], float]: Accepted output, call details and
+            total latency across tiers
+        """
+        total_latency = 0.0
+        metrics.incr("ocr.cascade.requests")
+        for tier, model in enumerate(self.models):
+            is_last = tier == len(self.models) - 1
+            started = time.perf_counter()
+            try:
+                parsed, details, _ = await self._invoke(
+                    self._structured_llm(profile, multi=multi, model=model), messages, model, deadline
+                )
+                issues = validate(parsed)
+            except Exception as e:
+                if is_last:
+                    raise
+                issues = [f"{type(e).__name__}: {str(e)}"]
+            total_latency += time.perf_counter() - started
+
+            if not issues or is_last:
+                details.update({"model": model, "tier": str(tier), "escalated": str(tier > 0).lower()})
+                if issues:
+                    details["validation_issues"] = "; ".join(issues)
+                return parsed, details, total_latency
+
+            metrics.incr("ocr.cascade.escalations")
+            metrics.incr(f"ocr.cascade.escalations.{model}")
+            logger.info(f"Escalating OCR from {model}: {'; '.join(issues)}")
+
+    def cascade_stats(self) -> Dict[str, Any]:
+        """
+        Model cascade summary for the metrics snapshot
+
+        Returns:
+            Dict[str, Any]: tiers (List[str]), requests and escalations (int),
+                escalation_rate (float) and latency_by_tier (Dict[str, Optional[float]], p50 seconds)
+        """
+        requests = metrics.counter("ocr.cascade.requests")
+        escalations = metrics.counter("ocr.cascade.escalations")
+        return {
+            "tiers": self.models,
+            "requests": requests,
+            "escalations": escalations,
+            "escalation_rate": (escalations / requests) if requests else 0.0,
+            "latency_by_tier": {
+                model: metrics.percentile(f"ocr.llm_latency.{model}", 50) for model in self.models
+            },
+        }
+
+    async def warm_up(self) -> None:
+        """
+        Open pooled connections to the Anthropic API ahead of the first request
+        """
+        await warm_up_llm_connections()
 
     async def process_document(
         self, 
         image_base64: str, 
-        document_type: str = "ID Card"
+        document_type: str = "ID Card",
+        profile: Optional[str] = None
     ) -> DocumentExtractionResult:
         """
         Async method to process a single document image
@@ -77,62 +444,188 @@ class DocumentOCRProcessor:
         Args:
             image_base64 (str): Base64 encoded image
             document_type (str): Type of document to process
+            profile (Optional[str]): Extraction profile name, defaults to settings
         
         Returns:
             DocumentExtractionResult: Extracted document information
         """
-        prompt = f"""
-        Analyze this {document_type} image and extract the required information and return the answer in the language of the document .
-        Make sure to extract all visible text fields accurately.
-        
-        IMPORTANT: 
-        - Be precise and structured
-        - If information is partially visible or unclear, mark as None
-        - Do NOT hallucinate or make up information
-        - Preserve the exact format of dates and numbers
-        - For names, combine surname and firstname if they are separate
-        - Extract any ID numbers or document numbers shown
-        
-        Call the extract_document_info function with the extracted information.
-        """
-        
+        extraction_profile = get_extraction_profile(profile)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = OCRResultCache.make_key(
+                image_base64,
+                document_type=document_type,
+                model="|".join(self.models),
+                prompt_version=OCR_PROMPT_VERSION,
+                profile=extraction_profile.name
+            )
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"OCR cache hit for {document_type}")
+                result = DocumentExtractionResult.model_validate(cached)
+                result.additional_details = {**(result.additional_details or {}), "cache": "hit"}
+                return result
+
         message_content = [
-            {"type": "text", "text": prompt},
+            {"type": "text", "text": f"Document type: {document_type}"},
             {
                 "type": "image_url",
                 "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}
             }
         ]
         
-        message = HumanMessage(content=message_content)
+        messages = [self._system_message(extraction_profile), HumanMessage(content=message_content)]
+        deadline = time.monotonic() + settings.ocr_request_deadline_seconds
+
+        def _to_info(parsed: Any) -> Optional[DocumentInfo]:
+            return DocumentInfo(**parsed.model_dump()) if parsed is not None else None
         
         try:
-            doc_info = await asyncio.to_thread(
-                self.llm.invoke,
-                [message]
+            parsed, details, latency = await self._run_cascade(
+                extraction_profile,
+                messages,
+                validate=lambda output: validate_document_info(_to_info(output), document_type),
+                deadline=deadline
             )
+            doc_info = _to_info(parsed)
+            # The last tier's output is returned even when it fails validation,
+            # but it is flagged and never cached
+            validated = "validation_issues" not in details
             
-            return DocumentExtractionResult(
+            result = DocumentExtractionResult(
                 document_info=doc_info,
-                additional_details={"status": "success"}
+                additional_details={
+                    "status": "success" if validated else "validation_failed",
+                    "profile": extraction_profile.name,
+                    **details
+                }
             )
+            if cache_key is not None and doc_info is not None and validated:
+                await self.cache.set(cache_key, result.model_dump(), latency_s=latency)
+            return result
             
         except Exception as e:
             return DocumentExtractionResult(
                 additional_details={"error": str(e)}
             )
 
+    async def process_documents_combined(
+        self,
+        images_base64: List[str],
+        document_types: List[str],
+        profile: Optional[str] = None
+    ) -> List[DocumentExtractionResult]:
+        """
+        Extract several documents with a single structured-output request
+
+        Args:
+            images_base64 (List[str]): Base64 encoded images
+            document_types (List[str]): Type of each document
+            profile (Optional[str]): Extraction profile name, defaults to settings
+
+        Returns:
+            List[DocumentExtractionResult]: One result per image, in order
+        """
+        extraction_profile = get_extraction_profile(profile)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = OCRResultCache.make_key(
+                "\x00".join(images_base64),
+                document_type="|".join(document_types),
+                model="|".join(self.models),
+                prompt_version=OCR_PROMPT_VERSION,
+                profile=extraction_profile.name,
+                mode="combined"
+            )
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("OCR cache hit for combined extraction")
+                results = [DocumentExtractionResult.model_validate(item) for item in cached["results"]]
+                for result in results:
+                    result.additional_details = {**(result.additional_details or {}), "cache": "hit"}
+                return results
+
+        message_content: List[Dict] = []
+        for index, (image_base64, doc_type) in enumerate(zip(images_base64, document_types), start=1):
+            message_content.append({"type": "text", "text": f"Image {index}: {doc_type}"})
+            message_content.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}
+            })
+        messages = [
+            self._system_message(extraction_profile, multi=True),
+            HumanMessage(content=message_content)
+        ]
+
+        try:
+            def _validate(output: Any) -> List[str]:
+                if output is None or len(output.documents) != len(images_base64):
+                    return [f"expected {len(images_base64)} documents"]
+                return [
+                    f"image {index}: {issue}"
+                    for index, (info, doc_type) in enumerate(zip(output.documents, document_types), start=1)
+                    for issue in validate_document_info(DocumentInfo(**info.model_dump()), doc_type)
+                ]
+
+            multi_info, details, latency = await self._run_cascade(
+                extraction_profile,
+                messages,
+                validate=_validate,
+                multi=True,
+                deadline=time.monotonic() + settings.ocr_request_deadline_seconds
+            )
+            if multi_info is None or len(multi_info.documents) != len(images_base64):
+                raise ValueError(f"Expected {len(images_base64)} documents from combined extraction")
+            validated = "validation_issues" not in details
+
+            results = [
+                DocumentExtractionResult(
+                    document_info=DocumentInfo(**info.model_dump()),
+                    additional_details={
+                        "status": "success" if validated else "validation_failed",
+                        "mode": "combined",
+                        "profile": extraction_profile.name,
+                        **details
+                    }
+                )
+                for info in multi_info.documents
+            ]
+            if cache_key is not None and validated:
+                await self.cache.set(
+                    cache_key,
+                    {"results": [result.model_dump() for result in results]},
+                    latency_s=latency
+                )
+            return results
+
+        except Exception as e:
+            logger.error(f"Combined document extraction failed: {str(e)}")
+            return [
+                DocumentExtractionResult(additional_details={"error": str(e), "mode": "combined"})
+                for _ in images_base64
+            ]
+
 class MultiDocumentProcessor:
     """
     Process multiple documents simultaneously
     """
-    def __init__(self):
-        self.ocr_processor = DocumentOCRProcessor()
+    def __init__(
+        self,
+        ocr_processor: Optional[DocumentOCRProcessor] = None,
+        duplicate_index: Optional[PerceptualHashIndex] = None
+    ):
+        self.ocr_processor = ocr_processor or DocumentOCRProcessor()
+        self.duplicate_index = duplicate_index
+
+    async def warm_up(self) -> None:
+        """Warm up the underlying OCR processor"""
+        await self.ocr_processor.warm_up()
 
     async def process_documents(
         self, 
         images: List[str], 
-        document_types: Optional[List[str]] = None
+        document_types: Optional[List[str]] = None,
+        profile: Optional[str] = None
     ) -> List[DocumentExtractionResult]:
         """
         Process multiple documents concurrently
@@ -140,6 +633,7 @@ class MultiDocumentProcessor:
         Args:
             images (List[str]): Base64 encoded images
             document_types (Optional[List[str]]): Types of documents
+            profile (Optional[str]): Extraction profile name
         
         Returns:
             List of extracted document information
@@ -148,13 +642,119 @@ class MultiDocumentProcessor:
             document_types = ["ID Card"] * len(images)
         
         tasks = [
-            self.ocr_processor.process_document(img, doc_type)
+            self.ocr_processor.process_document(img, doc_type, profile=profile)
             for img, doc_type in zip(images, document_types)
         ]
         
         return await asyncio.gather(*tasks)
 
+    async def extract_documents(
+        self,
+        images: List[str],
+        document_types: Optional[List[str]] = None,
+        combined: Optional[bool] = None,
+        profile: Optional[str] = None,
+        image_hashes: Optional[List[Optional[int]]] = None,
+        session_id: Optional[str] = None
+    ) -> MultiDocumentExtractionResult:
+        """
+        Extract documents and check that they describe the same person
+
+        Documents whose perceptual hash is within the duplicate index's
+        distance of an earlier submission are reported in near_duplicates for
+        review. With duplicate_index_reuse_results on, the earlier result is
+        reused only for byte-identical images or a resubmission within the
+        same session; a look-alike from another session is always re-extracted.
+
+        Args:
+            images (List[str]): Base64 encoded images
+            document_types (Optional[List[str]]): Types of documents
+            combined (Optional[bool]): Send all images in one request instead of
+                one request per image; defaults to settings.ocr_combined_extraction
+            profile (Optional[str]): Extraction profile name, defaults to settings.ocr_extraction_profile
+            image_hashes (Optional[List[Optional[int]]]): Perceptual hash per image (PreprocessedImage.phash)
+            session_id (Optional[str]): Registration session, counted for document reuse flagging
+                and required for same-session reuse
+
+        Returns:
+            MultiDocumentExtractionResult: Results with name/DOB consistency flags
+        """
+        if not document_types:
+            document_types = ["ID Card"] * len(images)
+        extraction_profile = get_extraction_profile(profile)
+        if combined is None:
+            combined = settings.ocr_combined_extraction
+
+        hashes = list(image_hashes) if image_hashes and self.duplicate_index is not None else []
+        hashes += [None] * (len(images) - len(hashes))
+        contexts = [
+            f"{document_type}|{extraction_profile.name}|{'|'.join(self.ocr_processor.models)}|{OCR_PROMPT_VERSION}"
+            for document_type in document_types
+        ]
+
+        results: List[Optional[DocumentExtractionResult]] = [None] * len(images)
+        near_duplicates: List[Optional[Dict]] = [None] * len(images)
+        digests: List[Optional[str]] = [None] * len(images)
+        for index, (phash, context) in enumerate(zip(hashes, contexts)):
+            if phash is None:
+                continue
+            digests[index] = hashlib.sha256(images[index].encode()).hexdigest()
+            match = self.duplicate_index.lookup(phash, context, session_id, digests[index])
+            if match is None:
+                continue
+            near_duplicates[index] = {
+                "distance": match.distance,
+                "sessions": match.sessions,
+                "flagged": match.flagged,
+                "exact": match.exact,
+                "same_session": match.same_session
+            }
+            if settings.duplicate_index_reuse_results and (match.exact or match.same_session):
+                logger.info(f"Reusing extraction of a resubmitted {document_types[index]} (distance {match.distance})")
+                metrics.incr("duplicate_index.reused")
+                result = DocumentExtractionResult.model_validate(match.payload)
+                result.additional_details = {
+                    **(result.additional_details or {}),
+                    "cache": "near_duplicate",
+                    "phash_distance": str(match.distance)
+                }
+                results[index] = result
+
+        pending = [index for index, result in enumerate(results) if result is None]
+        if combined and len(pending) > 1:
+            mode = "combined"
+            extracted = await self.ocr_processor.process_documents_combined(
+                [images[index] for index in pending],
+                [document_types[index] for index in pending],
+                profile=extraction_profile.name
+            )
+        else:
+            mode = "fan_out"
+            extracted = await self.process_documents(
+                [images[index] for index in pending],
+                [document_types[index] for index in pending],
+                profile=extraction_profile.name
+            )
+
+        for index, result in zip(pending, extracted):
+            results[index] = result
+            if hashes[index] is not None and result.document_info is not None:
+                self.duplicate_index.add_or_merge(
+                    hashes[index], contexts[index], result.model_dump(), session_id, digests[index]
+                )
+
+        return MultiDocumentExtractionResult(
+            results=results,
+            consistency=check_document_consistency([result.document_info for result in results]),
+            mode=mode,
+            profile=extraction_profile.name,
+            near_duplicates=near_duplicates
+        )
+
 # Utility function for base64 conversion
+BASE64_CHUNK_BYTES = 3 * 256 * 1024
+
+
 def encode_image_to_base64(file_path: Union[str, bytes]) -> str:
     """
     Convert image to base64
@@ -166,9 +766,202 @@ def encode_image_to_base64(file_path: Union[str, bytes]) -> str:
         Base64 encoded string
     """
     if isinstance(file_path, str):
+        # Encode in chunks (a multiple of 3 bytes, so no padding in between)
+        # rather than reading the whole file first
+        parts = []
         with open(file_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+            while chunk := image_file.read(BASE64_CHUNK_BYTES):
+                parts.append(base64.b64encode(chunk).decode('utf-8'))
+        return "".join(parts)
     elif isinstance(file_path, bytes):
         return base64.b64encode(file_path).decode('utf-8')
     
-    raise ValueError("Invalid image input")
\ No newline at end of file
+    raise ValueError("Invalid image input")
+
+# Above this size base64 encoding is worth moving to the image worker pool
+BASE64_OFFLOAD_MIN_BYTES = 1024 * 1024
+
+
+async def encode_image_to_base64_async(image: Union[str, bytes]) -> str:
+    """
+    encode_image_to_base64 that keeps large images off the event loop
+    """
+    if isinstance(image, bytes) and len(image) < BASE64_OFFLOAD_MIN_BYTES:
+        return encode_image_to_base64(image)
+    return await run_image_task(encode_image_to_base64, image)
+
+
+# CPU-bound image work (decode, resize, re-encode, quality checks)
+class SharedImageBytes(NamedTuple):
+    """Handle of image bytes placed in shared memory for a worker process"""
+    name: str
+    size: int
+
+
+def _run_image_task(fn: Callable[..., Any], image: Any, args: tuple, kwargs: Dict) -> Any:
+    """Worker-side trampoline: read shared-memory images back into bytes, then call fn"""
+    if isinstance(image, SharedImageBytes):
+        segment = shared_memory.SharedMemory(name=image.name)
+        try:
+            image = bytes(segment.buf[:image.size])
+        finally:
+            segment.close()
+    return fn(image, *args, **kwargs)
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+class ImageWorkerPool:
+    """
+    Shared executor for CPU-bound image operations.
+
+    In "process" mode the work runs in a ProcessPoolExecutor, so decoding and
+    resizing 10 MB photos neither blocks the event loop nor competes with it
+    for the GIL. Workers are forked from a forkserver that preloads the image
+    modules, never from the multi-threaded API process; like spawned workers
+    they re-import the launching script as "__mp_main__". Images are
+    passed as spooled file paths where possible; large in-memory images go
+    through shared memory instead of being pickled down a pipe.
+
+    Falls back to a thread pool when mode is "thread", when worker processes
+    cannot be started, or when the process pool breaks (e.g. a worker was
+    OOM-killed).
+    """
+    def __init__(
+        self,
+        mode: str = "process",
+        max_workers: Optional[int] = None,
+        start_method: str = "forkserver",
+        shared_memory_min_bytes: int = 256 * 1024
+    ):
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self.shared_memory_min_bytes = shared_memory_min_bytes
+        self._executor: Optional[Executor] = None
+
+    @property
+    def uses_processes(self) -> bool:
+        return isinstance(self._executor, ProcessPoolExecutor)
+
+    def _fall_back_to_threads(self, reason: str) -> None:
+        logger.warning(f"Image worker pool falling back to threads: {reason}")
+        metrics.incr("image_pool.fallbacks")
+        broken, self._executor = self._executor, None
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image")
+        self.mode = "thread"
+
+    async def start(self) -> None:
+        """Create the executor and start every worker before traffic arrives"""
+        if self._executor is not None:
+            return
+        if self.mode != "process":
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image")
+        else:
+            try:
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == "forkserver":
+                    # Import the image modules once in the forkserver so each forked worker starts warm.
+                    # Preloading does not stop workers from re-importing the launching script as
+                    # "__mp_main__", so entrypoints must be import-safe (uvicorn main:app is; with
+                    # `python main.py` each worker also builds, but never starts, its own app).
+                    context.set_forkserver_preload(["Library.utils", "Library.image_processing", "Library.image_quality"])
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                loop = asyncio.get_running_loop()
+                pids = await asyncio.gather(*(
+                    loop.run_in_executor(self._executor, _worker_ready) for _ in range(self.max_workers)
+                ))
+                logger.info(f"Started image worker pool ({len(set(pids))} {self.start_method} process(es))")
+            except (OSError, ValueError, NotImplementedError, BrokenProcessPool) as e:
+                self._fall_back_to_threads(str(e))
+        metrics.set_gauge("image_pool.workers", self.max_workers)
+
+    async def run(self, fn: Callable[..., Any], image: Union[bytes, str], *args, **kwargs) -> Any:
+        """
+        Run fn(image, *args, **kwargs) on the pool
+
+        Args:
+            fn: Module-level (picklable) function taking the image as its first argument
+            image (Union[bytes, str]): Image bytes or the path of a spooled image
+            *args, **kwargs: Further picklable arguments
+
+        Returns:
+            Any: fn's (picklable) result
+        """
+        if self._executor is None:
+            # Not started (scripts, workers without the API lifespan): default thread pool
+            return await asyncio.to_thread(fn, image, *args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            if not self.uses_processes:
+                return await loop.run_in_executor(self._executor, functools.partial(fn, image, *args, **kwargs))
+            try:
+                if isinstance(image, bytes) and len(image) >= self.shared_memory_min_bytes:
+                    return await self._run_shared(loop, fn, image, args, kwargs)
+                return await loop.run_in_executor(self._executor, _run_image_task, fn, image, args, kwargs)
+            except BrokenProcessPool as e:
+                self._fall_back_to_threads(f"process pool broke ({str(e)})")
+                return await loop.run_in_executor(self._executor, functools.partial(fn, image, *args, **kwargs))
+        finally:
+            metrics.observe(f"image_pool.{getattr(fn, '__name__', 'task')}", time.perf_counter() - started)
+
+    async def _run_shared(self, loop, fn: Callable[..., Any], image: bytes, args: tuple, kwargs: Dict) -> Any:
+        segment = shared_memory.SharedMemory(create=True, size=len(image))
+        try:
+            segment.buf[:len(image)] = image
+            metrics.incr("image_pool.shared_memory_bytes", len(image))
+            return await loop.run_in_executor(
+                self._executor, _run_image_task, fn, SharedImageBytes(segment.name, len(image)), args, kwargs
+            )
+        finally:
+            segment.close()
+            segment.unlink()
+
+    def close(self) -> None:
+        """Stop the workers (called on application shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("Closed image worker pool")
+
+
+_image_pool: Optional[ImageWorkerPool] = None
+
+
+def get_image_pool() -> ImageWorkerPool:
+    """
+    Process-wide image worker pool
+    """
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ImageWorkerPool(
+            mode=settings.image_pool_mode,
+            max_workers=settings.image_pool_workers,
+            start_method=settings.image_pool_start_method,
+            shared_memory_min_bytes=settings.image_pool_shared_memory_min_bytes
+        )
+    return _image_pool
+
+
+async def run_image_task(fn: Callable[..., Any], image: Union[bytes, str], *args, **kwargs) -> Any:
+    """Run a CPU-bound image function on the shared image worker pool"""
+    return await get_image_pool().run(fn, image, *args, **kwargs)
+
+
+async def start_image_pool() -> None:
+    """Start the image worker pool (called on application startup)"""
+    await get_image_pool().start()
+
+
+def close_image_pool() -> None:
+    """Stop the image worker pool (called on application shutdown)"""
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.close()
+    _image_pool = None
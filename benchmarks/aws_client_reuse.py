@@ -0,0 +1,59 @@
+"""
+Measure what building FaceVerificationService per request costs compared with
+reusing the container singleton.
+
+Usage:
+    python -m benchmarks.aws_client_reuse --requests 50
+
+Client construction is local (no AWS calls are made), so this runs offline
+with any credentials configured in the environment file.
+"""
+import argparse
+import statistics
+import time
+from typing import List
+
+from Customer.services.face_verification_service import FaceVerificationService
+
+
+def _per_request(requests: int) -> List[float]:
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        service = FaceVerificationService()
+        timings.append(time.perf_counter() - started)
+        service.close()
+    return timings
+
+
+def _shared(requests: int) -> List[float]:
+    started = time.perf_counter()
+    service = FaceVerificationService()
+    startup = time.perf_counter() - started
+
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        # What a request does with the singleton: resolve it from the container
+        assert service.s3 is not None and service.rekognition is not None
+        timings.append(time.perf_counter() - started)
+    service.close()
+    print(f"singleton startup cost: {startup * 1000:.1f}ms (paid once)")
+    return timings
+
+
+def run(requests: int) -> None:
+    for name, timings in (("per-request", _per_request(requests)), ("singleton", _shared(requests))):
+        print(
+            f"{name:>11}: "
+            f"median {statistics.median(timings) * 1000:.2f}ms, "
+            f"max {max(timings) * 1000:.2f}ms, "
+            f"total {sum(timings) * 1000:.1f}ms over {requests} requests"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    run(args.requests)
@@ -0,0 +1,89 @@
+"""
+Drive FaceVerificationService against a local Rekognition stub that throttles
+above a fixed concurrency, and report how the adaptive limiter and circuit
+breaker react.
+
+Usage:
+    python -m benchmarks.aws_throttling --requests 200 --capacity 4
+
+No AWS calls are made.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+from Customer.services.face_verification_service import FaceVerificationService
+from Library.metrics import metrics
+from Library.resilience import ServiceUnavailableError
+
+
+class ThrottlingRekognitionStub:
+    """Accepts at most `capacity` concurrent CompareFaces calls, throttles the rest"""
+    def __init__(self, capacity: int, latency: float, outage_after: int = 0):
+        self.capacity = capacity
+        self.latency = latency
+        self.outage_after = outage_after
+        self.calls = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def compare_faces(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self.outage_after and self.calls > self.outage_after:
+                raise ClientError(
+                    {"Error": {"Code": "InternalServerError"}, "ResponseMetadata": {"HTTPStatusCode": 500}},
+                    "CompareFaces"
+                )
+            if self._active >= self.capacity:
+                raise ClientError(
+                    {"Error": {"Code": "ThrottlingException"}, "ResponseMetadata": {"HTTPStatusCode": 400}},
+                    "CompareFaces"
+                )
+            self._active += 1
+        try:
+            time.sleep(self.latency)
+            return {"FaceMatches": [{"Similarity": 99.0}]}
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+async def run(requests: int, capacity: int, latency: float, outage_after: int) -> None:
+    stub = ThrottlingRekognitionStub(capacity, latency, outage_after)
+    service = FaceVerificationService(rekognition_client=stub, s3_client=object())
+    outcomes = Counter()
+
+    async def _one() -> None:
+        try:
+            await service.compare_faces(source_image_bytes=b"id", target_image_bytes=b"selfie")
+            outcomes["ok"] += 1
+        except ServiceUnavailableError:
+            outcomes["unavailable"] += 1
+
+    started = time.perf_counter()
+    # Arrive in bursts rather than all at once
+    for batch in range(0, requests, 20):
+        await asyncio.gather(*(_one() for _ in range(min(20, requests - batch))))
+    elapsed = time.perf_counter() - started
+    service.close()
+
+    snapshot = metrics.snapshot()
+    print(f"{requests} requests in {elapsed:.2f}s, outcomes {dict(outcomes)}, stub calls {stub.calls}")
+    print(f"final limit {service.limiters['rekognition'].limit} (stub capacity {capacity})")
+    for name in ("aws.rekognition.throttled", "aws.rekognition.circuit_opened", "aws.rekognition.circuit_rejected"):
+        print(f"{name}: {snapshot['counters'].get(name, 0)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--outage-after", type=int, default=0, help="Fail every call after this many (0 = never)")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.capacity, args.latency, args.outage_after))
@@ -0,0 +1,68 @@
+"""
+Compare per-image fan-out against single-call combined extraction.
+
+Usage:
+    python -m benchmarks.ocr_extraction_modes ID_CARD.jpg BIRTH_CERT.jpg --runs 5
+
+Calls the real Claude API (ANTHROPIC_API_KEY must be set). The OCR cache is
+disabled so every run pays for the model call.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from Library.image_processing import preprocess_document_image
+from Library.utils import DocumentOCRProcessor, MultiDocumentProcessor, encode_image_to_base64
+
+
+def _usage(results) -> Dict[str, int]:
+    details = [result.additional_details or {} for result in results]
+    if any("error" in detail for detail in details):
+        raise RuntimeError(f"Extraction failed: {details}")
+    if details and details[0].get("mode") == "combined":
+        # One request shared by every document
+        details = details[:1]
+    return {
+        "input_tokens": sum(int(detail.get("input_tokens", 0)) for detail in details),
+        "output_tokens": sum(int(detail.get("output_tokens", 0)) for detail in details),
+    }
+
+
+async def run(paths: List[str], runs: int, model: str) -> None:
+    images = []
+    for path in paths:
+        with open(path, "rb") as fh:
+            images.append(encode_image_to_base64(preprocess_document_image(fh.read()).data))
+    document_types = ["ID Card", "Birth Certificate"][:len(images)]
+
+    processor = MultiDocumentProcessor(DocumentOCRProcessor(model=model, cache=None))
+
+    for combined in (False, True):
+        latencies, input_tokens, output_tokens = [], [], []
+        for _ in range(runs):
+            started = time.perf_counter()
+            extraction = await processor.extract_documents(images, document_types, combined=combined)
+            latencies.append(time.perf_counter() - started)
+            usage = _usage(extraction.results)
+            input_tokens.append(usage["input_tokens"])
+            output_tokens.append(usage["output_tokens"])
+
+        print(
+            f"{extraction.mode:>9}: "
+            f"median latency {statistics.median(latencies):.2f}s, "
+            f"max {max(latencies):.2f}s, "
+            f"input tokens {statistics.mean(input_tokens):.0f}, "
+            f"output tokens {statistics.mean(output_tokens):.0f}, "
+            f"consistency {extraction.consistency}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="+", help="ID card image, optionally followed by a birth certificate")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--model", default="claude-3-opus-20240229")
+    args = parser.parse_args()
+    asyncio.run(run(args.images[:2], args.runs, args.model))
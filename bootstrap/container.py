@@ -4,6 +4,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from Customer.db.repository.custimer_repository import CustomerRepository
 from Customer.services.customer_service import CustomerService
 from Customer.services.verification_service import VerificationService
+from Customer.services.face_verification_service import FaceVerificationService
+from Customer.services.ocr_job_service import OCRJobService
+from Customer.services.session_store import create_session_store
+from Customer.services.idempotency_store import create_idempotency_store
+from Library.config import settings
+from Library.ocr_cache import create_ocr_cache
+from Library.duplicate_index import create_duplicate_index
+from Library.utils import DocumentOCRProcessor, MultiDocumentProcessor
 from persistence.db.models.base import SessionLocal
 
 class Container(containers.DeclarativeContainer):
@@ -21,6 +29,44 @@ class Container(containers.DeclarativeContainer):
         CustomerRepository
     )
 
+    # Registration sessions (shared by the routes and the OCR job workers)
+    session_store = providers.Singleton(
+        create_session_store
+    )
+
+    # Idempotency-Key responses for the extract-documents routes
+    idempotency_store = providers.Singleton(
+        create_idempotency_store
+    )
+
+    # OCR engine (built once, warmed up on startup)
+    ocr_result_cache = providers.Singleton(
+        create_ocr_cache
+    )
+
+    ocr_processor = providers.Singleton(
+        DocumentOCRProcessor,
+        model=settings.ocr_model,
+        fast_model=settings.ocr_fast_model if settings.ocr_cascade_enabled else None,
+        cache=ocr_result_cache
+    )
+
+    # Perceptual hashes of earlier submissions, for near-duplicate flagging
+    duplicate_index = providers.Singleton(
+        create_duplicate_index
+    )
+
+    document_processor = providers.Singleton(
+        MultiDocumentProcessor,
+        ocr_processor=ocr_processor,
+        duplicate_index=duplicate_index
+    )
+
+    # AWS clients (built once at startup, closed on shutdown)
+    face_verification_service = providers.Singleton(
+        FaceVerificationService
+    )
+
     # Services
     customer_service = providers.Factory(
         CustomerService,
@@ -28,5 +74,16 @@ class Container(containers.DeclarativeContainer):
     )   
         
     verification_service = providers.Singleton(
-            VerificationService
-        )
\ No newline at end of file
+            VerificationService,
+            ocr_processor=ocr_processor,
+            face_service=face_verification_service
+        )
+
+    # Background OCR jobs
+    ocr_job_service = providers.Singleton(
+        OCRJobService,
+        processor=document_processor,
+        verification_service=verification_service,
+        face_service=face_verification_service,
+        sessions=session_store
+    )
@@ -1,6 +1,12 @@
 from bootstrap.container import Container
 from Customer.api.customer_route import router as customer_router
-from fastapi import FastAPI
+from Library.metrics import EventLoopLagMonitor, metrics
+from Library.llm_client import close_llm_clients
+from Library.config import settings
+from Library.utils import close_image_pool, start_image_pool
+from Library.resilience import ServiceUnavailableError
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
@@ -50,14 +56,47 @@ def create_app() -> FastAPI:
     return app
 
 app = create_app()
+lag_monitor = EventLoopLagMonitor(settings.event_loop_lag_interval_seconds)
 
 @app.on_event("startup")
 async def startup():
     logger.info("Running application startup tasks...")
+    lag_monitor.start()
+    # Start every image worker now rather than on the first upload
+    await start_image_pool()
+    # Build the shared OCR engine now rather than on the first request
+    await app.container.document_processor().warm_up()
+    # Build the boto3 clients and AWS executor once instead of per request
+    app.container.face_verification_service()
+    # OCR_JOB_WORKERS=0 makes this process enqueue-only (jobs run in ocr_worker.py)
+    await app.container.ocr_job_service().start(consume=settings.ocr_job_workers > 0)
+    await app.container.session_store().start()
 
 @app.on_event("shutdown")
 async def shutdown():
     logger.info("Running application shutdown tasks...")
+    await app.container.ocr_job_service().stop()
+    await close_llm_clients()
+    app.container.face_verification_service().close()
+    await app.container.session_store().close()
+    await app.container.idempotency_store().close()
+    close_image_pool()
+    await lag_monitor.stop()
+
+@app.exception_handler(ServiceUnavailableError)
+async def service_unavailable_handler(request: Request, exc: ServiceUnavailableError):
+    """Throttled/degraded dependencies are retryable: 503 with a Retry-After hint"""
+    logger.warning(f"Service unavailable for {request.url.path}: {str(exc)}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily unavailable, please retry"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+    )
+
+@app.get("/metrics", tags=["Monitoring"])
+async def get_metrics():
+    """In-process counters, gauges and latency percentiles"""
+    return metrics.snapshot()
 
     
 # Main execution
@@ -0,0 +1,67 @@
+"""
+Standalone OCR worker process.
+
+Consumes extraction jobs from RabbitMQ (OCR_JOB_QUEUE_BACKEND=rabbitmq) so OCR
+capacity can be scaled independently of the API. Sessions must be shared with
+the API through Redis (SESSION_STORE_BACKEND=redis); the worker refuses to
+start otherwise.
+
+OCR_WORKER_CONCURRENCY sets how many jobs the worker runs at once. It is
+separate from OCR_JOB_WORKERS (consumers inside API processes), so API and
+worker processes can share one env file.
+
+    python ocr_worker.py
+"""
+import asyncio
+
+from loguru import logger
+
+from bootstrap.container import Container
+from Library.config import settings
+from Library.llm_client import close_llm_clients
+from Library.utils import close_image_pool, start_image_pool
+
+
+def check_backends() -> None:
+    """
+    A separate worker only shares work and results with the API through
+    RabbitMQ and Redis; with the in-process backends it would consume its own
+    empty queue and write sessions the API never sees.
+
+    Raises:
+        RuntimeError: If the queue or session store backend is process-local
+    """
+    problems = []
+    if settings.ocr_job_queue_backend.lower() != "rabbitmq":
+        problems.append(f"OCR_JOB_QUEUE_BACKEND=rabbitmq (got '{settings.ocr_job_queue_backend}')")
+    if settings.session_store_backend.lower() != "redis":
+        problems.append(f"SESSION_STORE_BACKEND=redis (got '{settings.session_store_backend}')")
+    if problems:
+        raise RuntimeError(f"ocr_worker.py requires {' and '.join(problems)}")
+
+
+async def main() -> None:
+    check_backends()
+    container = Container()
+    processor = container.document_processor()
+    job_service = container.ocr_job_service(workers=settings.ocr_worker_concurrency)
+
+    # Jobs fetch, pre-process and crop the documents here, so start what main.py starts
+    await start_image_pool()
+    await processor.warm_up()
+    await container.session_store().start()
+    await job_service.start()
+    logger.info("OCR worker running, waiting for jobs...")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        logger.info("Shutting down OCR worker...")
+        await job_service.stop()
+        await close_llm_clients()
+        container.face_verification_service().close()
+        await container.session_store().close()
+        close_image_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,12 @@
+import os
+
+# Library.config requires these settings; tests never talk to the real services
+for name in (
+    "DATABASE_HOST", "DATABASE_USERNAME", "DATABASE_PASSWORD", "DATABASE_NAME", "DATABASE_PORT",
+    "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_BUCKET_NAME", "AWS_REGION",
+    "OPENAI_API_KEY", "LANGCHAIN_API_KEY", "LANGCHAIN_PROJECT", "ANTHROPIC_API_KEY", "GROQ_API_KEY",
+    "UNSTRUCTURED_API_KEY", "TAVILY_API_KEY", "SECRET_KEY", "ENCRYPTION_KEY", "BACKEND_URL",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("LANGCHAIN_TRACING_V2", "false")
+os.environ.setdefault("ENVIRONMENT", "test")
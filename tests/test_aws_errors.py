@@ -0,0 +1,37 @@
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import ClientError, EndpointConnectionError, ParamValidationError
+
+from Customer.services.face_verification_service import _aws_error_kind
+
+
+def _client_error(code: str, status: int) -> ClientError:
+    return ClientError({"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, "PutObject")
+
+
+def _upload_failed(cause: Exception) -> S3UploadFailedError:
+    try:
+        try:
+            raise cause
+        except ClientError as e:
+            raise S3UploadFailedError(f"Failed to upload: {e}")
+    except S3UploadFailedError as wrapped:
+        return wrapped
+
+
+def test_client_error_kinds():
+    assert _aws_error_kind(_client_error("NoSuchBucket", 404)) == "client"
+    assert _aws_error_kind(_client_error("SlowDown", 503)) == "throttled"
+    assert _aws_error_kind(_client_error("InternalError", 500)) == "degraded"
+
+
+def test_upload_failure_is_classified_by_the_wrapped_client_error():
+    assert _aws_error_kind(_upload_failed(_client_error("AccessDenied", 403))) == "client"
+    assert _aws_error_kind(_upload_failed(_client_error("SlowDown", 503))) == "throttled"
+
+
+def test_parameter_validation_is_a_client_error():
+    assert _aws_error_kind(ParamValidationError(report="Unknown parameter")) == "client"
+
+
+def test_transport_failure_is_degraded():
+    assert _aws_error_kind(EndpointConnectionError(endpoint_url="http://localhost")) == "degraded"
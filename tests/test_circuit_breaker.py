@@ -0,0 +1,38 @@
+import pytest
+
+from Library.resilience import CircuitBreaker, ServiceUnavailableError
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return breaker
+
+
+def test_half_open_admits_a_single_probe():
+    breaker = _half_open_breaker()
+
+    with pytest.raises(ServiceUnavailableError):
+        breaker.before_call()
+
+
+def test_neutral_outcome_rearms_the_probe_without_closing():
+    breaker = _half_open_breaker()
+
+    breaker.record_neutral()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+
+
+def test_probe_success_closes_and_failure_reopens():
+    breaker = _half_open_breaker()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker = _half_open_breaker()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,66 @@
+import asyncio
+
+from Library.resilience import AdaptiveConcurrencyLimiter
+
+
+def _limiter(initial_limit: int = 8, max_limit: int = 16) -> AdaptiveConcurrencyLimiter:
+    return AdaptiveConcurrencyLimiter("test.limiter", initial_limit=initial_limit, min_limit=1, max_limit=max_limit)
+
+
+def test_throttling_halves_the_limit_down_to_the_minimum():
+    async def scenario():
+        limiter = _limiter()
+        limits = []
+        for _ in range(5):
+            await limiter.acquire()
+            limiter.release(throttled=True)
+            limits.append(limiter.limit)
+        return limits
+
+    assert asyncio.run(scenario()) == [4, 2, 1, 1, 1]
+
+
+def test_successes_grow_the_limit_additively():
+    async def scenario():
+        limiter = _limiter(initial_limit=4)
+        for _ in range(5):
+            await limiter.acquire()
+            limiter.release()
+        grown = limiter.limit
+        for _ in range(1000):
+            await limiter.acquire()
+            limiter.release()
+        return grown, limiter.limit
+
+    # Roughly one slot per window of `limit` successes, capped at max_limit
+    assert asyncio.run(scenario()) == (5, 16)
+
+
+def test_release_wakes_a_waiter():
+    async def scenario():
+        limiter = _limiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        return limiter.in_flight
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_cancelled_wakeup_is_passed_to_the_next_waiter():
+    async def scenario():
+        limiter = _limiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        first = asyncio.ensure_future(limiter.acquire())
+        second = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        # release() resolves the first waiter, which is cancelled before it runs
+        limiter.release()
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+        return first.cancelled(), limiter.in_flight
+
+    assert asyncio.run(scenario()) == (True, 1)
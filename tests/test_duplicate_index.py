@@ -0,0 +1,69 @@
+from Library.duplicate_index import PerceptualHashIndex
+
+PHASH = 0x0123456789ABCDEF
+LOOK_ALIKE = PHASH ^ 0b101  # two bits apart
+CONTEXT = "ID Card|full|model|v1"
+PAYLOAD = {"document_info": {"full_name": "Jane Doe"}}
+
+
+def _index() -> PerceptualHashIndex:
+    index = PerceptualHashIndex(max_distance=4, bands=8, alert_sessions=3)
+    index.add(PHASH, CONTEXT, PAYLOAD, session_id="session-a", digest="digest-a")
+    return index
+
+
+def test_look_alike_from_another_session_is_flag_only():
+    match = _index().lookup(LOOK_ALIKE, CONTEXT, session_id="session-b", digest="digest-b")
+
+    assert match.distance == 2
+    assert not match.exact
+    assert not match.same_session
+
+
+def test_resubmission_in_the_same_session_is_reusable():
+    match = _index().lookup(LOOK_ALIKE, CONTEXT, session_id="session-a", digest="digest-b")
+
+    assert match.same_session
+
+
+def test_identical_bytes_are_reusable_across_sessions():
+    match = _index().lookup(PHASH, CONTEXT, session_id="session-b", digest="digest-a")
+
+    assert match.exact
+    assert not match.same_session
+
+
+def test_document_seen_in_many_sessions_is_flagged():
+    index = _index()
+    index.lookup(LOOK_ALIKE, CONTEXT, session_id="session-b")
+    match = index.lookup(LOOK_ALIKE, CONTEXT, session_id="session-c")
+
+    assert match.sessions == 3
+    assert match.flagged
+
+
+def test_other_context_does_not_match():
+    assert _index().lookup(PHASH, "Birth Certificate|full|model|v1", session_id="session-b") is None
+
+
+def test_resubmissions_accumulate_on_one_entry():
+    index = PerceptualHashIndex(max_distance=4, bands=8, alert_sessions=3)
+    matches = []
+    for session_id in ("session-a", "session-b", "session-c", "session-d", "session-e"):
+        match = index.lookup(PHASH, CONTEXT, session_id=session_id, digest="digest")
+        matches.append(None if match is None else (match.sessions, match.flagged))
+        # Not reused across sessions, so the document is extracted again and indexed
+        index.add_or_merge(PHASH, CONTEXT, PAYLOAD, session_id=session_id, digest="digest")
+
+    assert matches == [None, (2, False), (3, True), (3, True), (3, True)]
+    assert len(index) == 1
+
+
+def test_merge_keeps_the_original_payload_and_session():
+    index = _index()
+    index.add_or_merge(LOOK_ALIKE, CONTEXT, {"document_info": None}, session_id="session-b")
+
+    match = index.lookup(PHASH, CONTEXT, session_id="session-a")
+
+    assert match.payload == PAYLOAD
+    assert match.same_session
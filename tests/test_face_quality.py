@@ -0,0 +1,72 @@
+import asyncio
+
+from Customer.services.face_verification_service import FaceVerificationService
+
+PASSING_FACE = {
+    "Confidence": 99.99,
+    "FaceOccluded": {"Value": False, "Confidence": 99.0},
+    "Pose": {"Pitch": 1.5, "Roll": -2.0, "Yaw": 3.0},
+    "EyesOpen": {"Value": True, "Confidence": 99.0},
+    "Quality": {"Brightness": 80.0, "Sharpness": 80.0},
+    "Sunglasses": {"Value": False, "Confidence": 99.0},
+    "MouthOpen": {"Value": False, "Confidence": 99.0},
+}
+
+
+class StubRekognition:
+    def __init__(self, face_details):
+        self.face_details = face_details
+
+    def detect_faces(self, **kwargs):
+        return {"FaceDetails": self.face_details}
+
+
+def _verify(face_details):
+    service = FaceVerificationService(rekognition_client=StubRekognition(face_details), s3_client=object())
+    try:
+        return asyncio.run(service.verify_face_quality(image_bytes=b"selfie"))
+    finally:
+        service.close()
+
+
+def test_passing_face_is_valid():
+    is_valid, details = _verify([PASSING_FACE])
+
+    assert is_valid
+    assert all(details["checks"].values())
+    assert details["suggestions"] == []
+
+
+def test_occluded_face_and_open_mouth_fail():
+    face = {**PASSING_FACE, "FaceOccluded": {"Value": True}, "MouthOpen": {"Value": True}}
+
+    is_valid, details = _verify([face])
+
+    assert not is_valid
+    assert not details["checks"]["face_not_occluded"]
+    assert not details["checks"]["mouth_closed"]
+    assert details["suggestions"] == [
+        "Please remove any objects blocking your face (hands, mask, etc.)",
+        "Please close your mouth for the photo",
+    ]
+
+
+def test_second_face_fails():
+    is_valid, details = _verify([PASSING_FACE, PASSING_FACE])
+
+    assert not is_valid
+    assert details["suggestions"] == ["Please ensure only your face is visible in the photo"]
+
+
+def test_file_size_suggestion_uses_configured_limits(monkeypatch):
+    from Library.config import settings
+
+    monkeypatch.setattr(settings, "selfie_prescreen_min_bytes", 20 * 1024)
+    monkeypatch.setattr(settings, "selfie_prescreen_max_bytes", 8 * 1024 * 1024)
+    service = FaceVerificationService(rekognition_client=StubRekognition([]), s3_client=object())
+    try:
+        suggestions = service._generate_suggestions({"file_size_valid": False})
+    finally:
+        service.close()
+
+    assert suggestions == ["Please provide an image between 20KB and 8MB"]
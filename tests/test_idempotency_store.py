@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from Customer.services.idempotency_store import (
+    IdempotencyConflictError,
+    IdempotencyInProgressError,
+    InMemoryIdempotencyStore,
+)
+
+
+def test_duplicate_gets_the_original_response():
+    async def scenario():
+        store = InMemoryIdempotencyStore()
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"session_id": "abc"}
+
+        first, second = await asyncio.gather(
+            store.run("key", "fingerprint", handler),
+            store.run("key", "fingerprint", handler)
+        )
+        return first, second, calls
+
+    first, second, calls = asyncio.run(scenario())
+
+    assert first == second == {"session_id": "abc"}
+    assert len(calls) == 1
+
+
+def test_reusing_a_key_for_another_request_conflicts():
+    async def scenario():
+        store = InMemoryIdempotencyStore()
+
+        async def handler():
+            return {}
+
+        await store.run("key", "fingerprint", handler)
+        await store.run("key", "other-fingerprint", handler)
+
+    with pytest.raises(IdempotencyConflictError):
+        asyncio.run(scenario())
+
+
+def test_duplicate_stops_waiting_for_a_slow_original():
+    async def scenario():
+        store = InMemoryIdempotencyStore(wait_timeout_seconds=0.05)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return {"session_id": "abc"}
+
+        original = asyncio.ensure_future(store.run("key", "fingerprint", slow))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(IdempotencyInProgressError):
+                await store.run("key", "fingerprint", slow)
+        finally:
+            release.set()
+        return await original
+
+    assert asyncio.run(scenario()) == {"session_id": "abc"}
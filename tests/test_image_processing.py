@@ -0,0 +1,47 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from Library.image_processing import preprocess_document_image
+
+
+def _jpeg(width: int, height: int, quality: int, noise: bool = False) -> bytes:
+    if noise:
+        pixels = np.random.default_rng(0).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        image = Image.fromarray(pixels)
+    else:
+        image = Image.new("RGB", (width, height), (180, 160, 140))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def test_small_jpeg_that_would_grow_is_kept_as_is():
+    original = _jpeg(400, 300, quality=30, noise=True)
+
+    result = preprocess_document_image(original, max_dimension=1600, jpeg_quality=95, crop=False)
+
+    assert result.data == original
+    assert result.bytes_saved == 0
+    assert result.phash is not None
+    assert (result.width, result.height) == (400, 300)
+
+
+def test_large_photo_is_downscaled():
+    original = _jpeg(3000, 2000, quality=95, noise=True)
+
+    result = preprocess_document_image(original, max_dimension=1000, jpeg_quality=80, crop=False)
+
+    assert max(result.width, result.height) == 1000
+    assert result.bytes_saved > 0
+
+
+def test_decompression_bomb_is_skipped(monkeypatch):
+    original = _jpeg(400, 300, quality=80)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+
+    result = preprocess_document_image(original, crop=False)
+
+    assert result.data == original
+    assert result.phash is None
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from Library.config import settings
+from Library.ocr_cache import create_ocr_cache
+from Library.utils import DocumentOCRProcessor
+
+
+class UnusedChatModel:
+    def with_structured_output(self, schema, name=None, include_raw=False):
+        return self
+
+    async def ainvoke(self, messages):
+        raise AssertionError("cache hits must not reach the model")
+
+
+class PrimedCache:
+    """Answers every lookup with the same stored payload"""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    async def get(self, key):
+        return self.payload
+
+    async def set(self, key, value, latency_s=None):
+        raise AssertionError("cache hits must not be written back")
+
+
+def _processor(cache):
+    return DocumentOCRProcessor(
+        model="stub-model",
+        cache=cache,
+        chat_model_factory=lambda name, max_tokens: UnusedChatModel()
+    )
+
+
+def test_single_cache_hits_are_tagged():
+    cache = PrimedCache({"document_info": None, "additional_details": {"status": "success"}})
+
+    result = asyncio.run(_processor(cache).process_document("aW1hZ2U=", "ID Card"))
+
+    assert result.additional_details == {"status": "success", "cache": "hit"}
+
+
+def test_combined_cache_hits_are_tagged():
+    stored = {"document_info": None, "additional_details": {"status": "success", "mode": "combined"}}
+    cache = PrimedCache({"results": [stored, stored]})
+
+    results = asyncio.run(_processor(cache).process_documents_combined(
+        ["aW1hZ2U=", "aW1hZ2Uy"], ["ID Card", "Birth Certificate"]
+    ))
+
+    assert [result.additional_details for result in results] == [
+        {"status": "success", "mode": "combined", "cache": "hit"}
+    ] * 2
+
+
+def test_redis_tier_requires_a_url(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_cache_persistent_backend", "redis")
+    monkeypatch.setattr(settings, "redis_url", None)
+
+    with pytest.raises(ValueError, match="REDIS_URL"):
+        create_ocr_cache()
@@ -0,0 +1,73 @@
+import asyncio
+from typing import get_args
+
+from langchain_core.messages import AIMessage
+
+from Library.utils import DocumentOCRProcessor
+
+
+def _blank(schema):
+    return schema(**{key: "" for key in schema.model_fields})
+
+
+class StubStructuredModel:
+    """Returns an extraction with every field empty, which never validates"""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+    async def ainvoke(self, messages):
+        if "documents" in self.schema.model_fields:
+            (document_schema,) = get_args(self.schema.model_fields["documents"].annotation)
+            count = sum(1 for part in messages[1].content if part["type"] == "image_url")
+            parsed = self.schema(documents=[_blank(document_schema) for _ in range(count)])
+        else:
+            parsed = _blank(self.schema)
+        return {"raw": AIMessage(content=""), "parsed": parsed, "parsing_error": None}
+
+
+class StubChatModel:
+    def with_structured_output(self, schema, name=None, include_raw=False):
+        return StubStructuredModel(schema)
+
+
+class RecordingCache:
+    def __init__(self):
+        self.stored = {}
+
+    async def get(self, key):
+        return self.stored.get(key)
+
+    async def set(self, key, value, latency_s=None):
+        self.stored[key] = value
+
+
+def _processor(cache):
+    return DocumentOCRProcessor(
+        model="stub-model",
+        fast_model="stub-fast-model",
+        cache=cache,
+        chat_model_factory=lambda name, max_tokens: StubChatModel()
+    )
+
+
+def test_invalid_last_tier_output_is_flagged_and_not_cached():
+    cache = RecordingCache()
+
+    result = asyncio.run(_processor(cache).process_document("aW1hZ2U=", "ID Card"))
+
+    assert result.additional_details["status"] == "validation_failed"
+    assert result.additional_details["tier"] == "1"
+    assert "missing full_name" in result.additional_details["validation_issues"]
+    assert cache.stored == {}
+
+
+def test_invalid_combined_output_is_flagged_and_not_cached():
+    cache = RecordingCache()
+
+    results = asyncio.run(_processor(cache).process_documents_combined(
+        ["aW1hZ2U=", "aW1hZ2Uy"], ["ID Card", "Birth Certificate"]
+    ))
+
+    assert [result.additional_details["status"] for result in results] == ["validation_failed"] * 2
+    assert cache.stored == {}
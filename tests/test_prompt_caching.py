@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from langchain_core.messages import AIMessage
+
+from Library.config import settings
+from Library.extraction_profiles import EXTRACTION_PROFILES
+from Library.metrics import metrics
+from Library.utils import DocumentOCRProcessor
+
+EXTRACTED = {
+    "full_name": "Jane Doe",
+    "date_of_birth": "01/01/1990",
+    "document_type": "ID Card",
+    "identification_number": "123456789",
+}
+
+
+class StubStructuredModel:
+    def __init__(self, schema, calls):
+        self.schema = schema
+        self.calls = calls
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages)
+        parsed = self.schema(**{key: EXTRACTED.get(key, "") for key in self.schema.model_fields})
+        raw = AIMessage(content="", usage_metadata={
+            "input_tokens": 1200,
+            "output_tokens": 80,
+            "total_tokens": 1280,
+            "input_token_details": {"cache_read": 1000, "cache_creation": 24},
+        })
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+
+class StubChatModel:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def with_structured_output(self, schema, name=None, include_raw=False):
+        return StubStructuredModel(schema, self.calls)
+
+
+def _processor(calls, monkeypatch):
+    monkeypatch.setattr(settings, "llm_prompt_caching_enabled", True)
+    return DocumentOCRProcessor(
+        model="stub-model",
+        chat_model_factory=lambda name, max_tokens: StubChatModel(calls)
+    )
+
+
+def _system_block(messages):
+    return json.dumps(messages[0].content, sort_keys=True)
+
+
+def test_system_block_is_cacheable_and_stable(monkeypatch):
+    calls = []
+    processor = _processor(calls, monkeypatch)
+
+    async def scenario():
+        for profile in EXTRACTION_PROFILES:
+            for document_type in ("ID Card", "Birth Certificate"):
+                await processor.process_document("aW1hZ2U=", document_type, profile=profile)
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 2 * len(EXTRACTION_PROFILES)
+    for messages in calls:
+        (block,) = messages[0].content
+        assert block["cache_control"] == {"type": "ephemeral"}
+        # Per-request data stays out of the cached prefix
+        assert "Birth Certificate" not in block["text"]
+    for index in range(0, len(calls), 2):
+        # Same bytes for every request of a profile, so the prefix is served from the cache
+        assert _system_block(calls[index]) == _system_block(calls[index + 1])
+
+
+def test_cache_usage_is_recorded(monkeypatch):
+    calls = []
+    processor = _processor(calls, monkeypatch)
+    read_before = metrics.counter("llm.prompt_cache.read_tokens")
+    write_before = metrics.counter("llm.prompt_cache.write_tokens")
+
+    result = asyncio.run(processor.process_document("aW1hZ2U=", "ID Card"))
+
+    assert result.additional_details.get("status") == "success", result.additional_details
+    assert metrics.counter("llm.prompt_cache.read_tokens") - read_before == 1000
+    assert metrics.counter("llm.prompt_cache.write_tokens") - write_before == 24
+    assert result.additional_details["cache_read_input_tokens"] == "1000"
+    assert result.additional_details["cache_creation_input_tokens"] == "24"
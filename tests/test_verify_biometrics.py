@@ -0,0 +1,51 @@
+import asyncio
+
+from Customer.services.verification_service import VerificationService
+
+
+class StubFaceService:
+    def __init__(self, match_found: bool):
+        self.match_found = match_found
+        self.quality_cancelled = False
+
+    async def prescreen_selfie(self, image_bytes):
+        return True, {}
+
+    async def upload_to_s3(self, image_bytes, key):
+        return f"s3://bucket/{key}"
+
+    async def compare_faces(self, **kwargs):
+        return self.match_found, 97.0 if self.match_found else 12.0
+
+    async def verify_face_quality(self, **kwargs):
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            self.quality_cancelled = True
+            raise
+        return True, {"checks": {}, "suggestions": []}
+
+
+def _verify(face_service):
+    service = VerificationService(ocr_processor=object(), face_service=face_service)
+    return asyncio.run(service.verify_biometrics(b"selfie", "documents/id.jpg"))
+
+
+def test_mismatch_returns_without_waiting_for_quality():
+    face_service = StubFaceService(match_found=False)
+
+    result = _verify(face_service)
+
+    assert not result.success
+    assert result.details == {"similarity_score": 12.0}
+    assert face_service.quality_cancelled
+
+
+def test_match_waits_for_quality():
+    face_service = StubFaceService(match_found=True)
+
+    result = _verify(face_service)
+
+    assert result.success
+    assert result.details["face_match_score"] == 97.0
+    assert not face_service.quality_cancelled